@@ -1,13 +1,19 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
 from typing import Dict, Any, List, Optional
+from datetime import date
 from pydantic import BaseModel
-from app.schemas.globaltypes import APIResponse
+from app.schemas.globaltypes import APIResponse, LeaderboardSPU
 from app.config.database import get_db
+from app.services.response_cache import cached_json
 from app.controllers.staff.leaderboard_controller import (
     get_leaderboard_aggregated,
-    search_certificates_similarity
+    get_leaderboard_period,
+    search_certificates_page
 )
 
+# Largest page any of these endpoints returns
+MAX_LIMIT = 100
+
 router = APIRouter(
     prefix="/staff",
     tags=["Leaderboard"]
@@ -15,53 +21,107 @@ router = APIRouter(
 
 @router.get("/leaderboard", response_model=APIResponse[List[Dict[str, Any]]])
 async def get_staff_leaderboard(
-    limit: int = 10
-) -> APIResponse[List[Dict[str, Any]]]:
-    try:
-        leaderboard = await get_leaderboard_aggregated(limit)
-        
-        return APIResponse[List[Dict[str, Any]]](
-            status_code=200,
-            message="Leaderboard data retrieved successfully",
-            data=leaderboard
-        )
-        
-    except HTTPException as e:
-        return APIResponse[List[Dict[str, Any]]](
-            status_code=e.status_code,
-            message=e.detail,
-            error=str(e.detail)
-        )
-    except Exception as e:
-        return APIResponse[List[Dict[str, Any]]](
-            status_code=500,
-            message="Failed to retrieve leaderboard data",
-            error=str(e)
-        )
+    request: Request,
+    limit: int = Query(10, ge=1, le=MAX_LIMIT),
+    fakultas: Optional[str] = None,
+    prodi: Optional[str] = None,
+    angkatan: Optional[str] = None
+) -> Response:
+    async def build():
+        try:
+            leaderboard = await get_leaderboard_aggregated(limit, fakultas, prodi, angkatan)
+
+            return APIResponse[List[Dict[str, Any]]](
+                status_code=200,
+                message="Leaderboard data retrieved successfully",
+                data=leaderboard
+            ), None
+
+        except HTTPException as e:
+            return APIResponse[List[Dict[str, Any]]](
+                status_code=e.status_code,
+                message=e.detail,
+                error=str(e.detail)
+            ), None
+        except Exception as e:
+            return APIResponse[List[Dict[str, Any]]](
+                status_code=500,
+                message="Failed to retrieve leaderboard data",
+                error=str(e)
+            ), None
+
+    params = {"limit": limit, "fakultas": fakultas, "prodi": prodi, "angkatan": angkatan}
+    return await cached_json(request, "leaderboard", params, build)
+
+@router.get("/leaderboard/period", response_model=APIResponse[LeaderboardSPU])
+async def get_staff_leaderboard_period(
+    request: Request,
+    period: str = "semester",
+    limit: int = Query(10, ge=1, le=MAX_LIMIT),
+    fakultas: Optional[str] = None,
+    prodi: Optional[str] = None,
+    angkatan: Optional[str] = None
+) -> Response:
+    async def build():
+        try:
+            leaderboard = await get_leaderboard_period(period, limit, fakultas, prodi, angkatan)
+
+            return APIResponse[LeaderboardSPU](
+                status_code=200,
+                message="Leaderboard data retrieved successfully",
+                data=LeaderboardSPU(**leaderboard)
+            ), None
+
+        except HTTPException as e:
+            return APIResponse[LeaderboardSPU](
+                status_code=e.status_code,
+                message=e.detail,
+                error=str(e.detail)
+            ), None
+        except Exception as e:
+            return APIResponse[LeaderboardSPU](
+                status_code=500,
+                message="Failed to retrieve leaderboard data",
+                error=str(e)
+            ), None
+
+    # Rolling windows move with the date, so it is part of the key
+    params = {
+        "period": period, "limit": limit, "fakultas": fakultas, "prodi": prodi, "angkatan": angkatan,
+        "day": date.today().isoformat(),
+    }
+    return await cached_json(request, "leaderboard_period", params, build)
 
 @router.get("/search", response_model=APIResponse[List[Dict[str, Any]]])
 async def search_staff_certificates(
+    request: Request,
     query: str,
-    limit: int = 5
-) -> APIResponse[List[Dict[str, Any]]]:
-    try:
-        results = await search_certificates_similarity(query, limit)
-        
-        return APIResponse[List[Dict[str, Any]]](
-            status_code=200,
-            message="Search results retrieved successfully",
-            data=results
-        )
-        
-    except HTTPException as e:
-        return APIResponse[List[Dict[str, Any]]](
-            status_code=e.status_code,
-            message=e.detail,
-            error=str(e.detail)
-        )
-    except Exception as e:
-        return APIResponse[List[Dict[str, Any]]](
-            status_code=500,
-            message="Failed to search certificates",
-            error=str(e)
-        )
\ No newline at end of file
+    limit: int = Query(5, ge=1, le=MAX_LIMIT),
+    cursor: Optional[str] = None
+) -> Response:
+    async def build():
+        try:
+            results, next_cursor = await search_certificates_page(query, limit, cursor)
+            # Paging travels in a header so the response body keeps its shape
+            headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+
+            return APIResponse[List[Dict[str, Any]]](
+                status_code=200,
+                message="Search results retrieved successfully",
+                data=results
+            ), headers
+
+        except HTTPException as e:
+            return APIResponse[List[Dict[str, Any]]](
+                status_code=e.status_code,
+                message=e.detail,
+                error=str(e.detail)
+            ), None
+        except Exception as e:
+            return APIResponse[List[Dict[str, Any]]](
+                status_code=500,
+                message="Failed to search certificates",
+                error=str(e)
+            ), None
+
+    return await cached_json(request, "search", {"query": query, "limit": limit, "cursor": cursor}, build)
\ No newline at end of file
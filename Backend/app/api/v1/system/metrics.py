@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends
+from typing import Dict, Any
+from app.schemas.globaltypes import APIResponse
+from app.controllers.auth.auth_controllers import verify_staff_token_logic
+from app.services.metrics import metrics_snapshot
+
+router = APIRouter(
+    prefix="/system",
+    tags=["System"]
+)
+
+@router.get("/metrics", response_model=APIResponse[Dict[str, Any]])
+async def get_metrics(
+    staff_payload: Dict[str, Any] = Depends(verify_staff_token_logic)
+) -> APIResponse[Dict[str, Any]]:
+    return APIResponse[Dict[str, Any]](
+        status_code=200,
+        message="Metrics retrieved successfully",
+        data=metrics_snapshot()
+    )
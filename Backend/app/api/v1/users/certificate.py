@@ -1,13 +1,19 @@
 from sre_parse import CATEGORY_UNI_DIGIT
 from fastapi import APIRouter, HTTPException, Depends, UploadFile, File
-from typing import Dict, Any
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, List
+import json
 from pydantic import BaseModel
 import uuid
 from app.schemas.globaltypes import APIResponse
 from app.config.database import get_db
 from app.controllers.auth.auth_controllers import verify_token_logic
 from app.controllers.certificates.certificates_controller import (
-    upload_certificate as upload_certificate_controller,
+    enqueue_certificate as enqueue_certificate_controller,
+    get_ingestion_job,
+    collect_batch_documents,
+    upload_certificates_batch,
+    stream_certificates_batch,
     complete_certificate as complete_certificate_controller
 )
 
@@ -46,12 +52,12 @@ async def upload_certificate(
 ) -> APIResponse:
     try:
         user_id = user_payload.get("sub")
-        result = await upload_certificate_controller(file, user_id)
+        job = await enqueue_certificate_controller(file, user_id)
         
         return APIResponse(
-            status_code=200,
-            message="Certificate uploaded and parsed successfully",
-            data=result
+            status_code=202,
+            message="Certificate queued for processing",
+            data=job
         )
         
     except HTTPException as e:
@@ -67,6 +73,82 @@ async def upload_certificate(
             error=str(e)
         )
 
+@router.post("/upload/batch", response_model=APIResponse)
+async def upload_certificate_batch(
+    files: List[UploadFile] = File(...),
+    stream: bool = False,
+    user_payload: Dict[str, Any] = Depends(verify_token_logic)
+):
+    try:
+        user_id = user_payload.get("sub")
+
+        if stream:
+            # Validated up front: once the stream starts its status can no longer change
+            documents = await collect_batch_documents(files)
+
+            # One JSON line per certificate as soon as it finishes
+            async def lines():
+                async for item in stream_certificates_batch(documents, user_id):
+                    yield json.dumps(item) + "\n"
+
+            return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+        results = await upload_certificates_batch(files, user_id)
+        summary = {
+            "total": len(results),
+            "processed": sum(1 for r in results if r["status"] == "processed"),
+            "duplicates": sum(1 for r in results if r["status"] == "duplicate"),
+            "failed": sum(1 for r in results if r["status"] == "failed"),
+            "results": results
+        }
+
+        return APIResponse(
+            status_code=200,
+            message="Batch upload processed",
+            data=summary
+        )
+
+    except HTTPException as e:
+        return APIResponse(
+            status_code=e.status_code,
+            message=e.detail,
+            error=str(e.detail)
+        )
+    except Exception as e:
+        return APIResponse(
+            status_code=500,
+            message="Batch upload failed",
+            error=str(e)
+        )
+
+@router.get("/jobs/{job_id}", response_model=APIResponse)
+async def get_upload_job(
+    job_id: str,
+    user_payload: Dict[str, Any] = Depends(verify_token_logic)
+) -> APIResponse:
+    try:
+        user_id = user_payload.get("sub")
+        job = await get_ingestion_job(job_id, user_id)
+
+        return APIResponse(
+            status_code=200,
+            message="Upload job retrieved successfully",
+            data=job
+        )
+
+    except HTTPException as e:
+        return APIResponse(
+            status_code=e.status_code,
+            message=e.detail,
+            error=str(e.detail)
+        )
+    except Exception as e:
+        return APIResponse(
+            status_code=500,
+            message="Failed to retrieve upload job",
+            error=str(e)
+        )
+
 @router.post("/submit", response_model=APIResponse)
 async def submit_certificate(
     request: SubmitRequest,
@@ -0,0 +1,101 @@
+import os
+from pathlib import Path
+from typing import Optional
+from pydantic_settings import BaseSettings
+
+env_path = Path(__file__).resolve().parent.parent.parent / ".env"
+
+class ServiceSettings(BaseSettings):
+    # Ingestion queue
+    INGEST_WORKERS: int = 2
+    INGEST_MAX_PENDING: int = 500
+    INGEST_SPOOL_DIR: str = "/tmp/aura_ingest"
+    INGEST_JOB_TTL_SECONDS: int = 3600
+
+    # Embedding models
+    SEARCH_EMBEDDING_MODEL: str = "all-mpnet-base-v2"
+    MODEL_WARMUP: bool = False
+    EMBEDDING_MAX_BATCH: int = 32
+    EMBEDDING_MAX_WAIT_MS: float = 10.0
+    EMBEDDING_BACKEND: str = "torch"  # "torch" or "onnx"
+    ONNX_MODEL_DIR: str = "models/onnx"
+    ONNX_INTRA_OP_THREADS: int = 0  # 0 lets onnxruntime decide
+
+    # Host-wide embedding worker process (off: models run in each API worker)
+    EMBEDDING_WORKER: bool = False
+    EMBEDDING_WORKER_SOCKET: str = "/tmp/aura_embedding/worker.sock"  # its directory must be private (0700)
+    EMBEDDING_WORKER_AUTHKEY: str = ""  # required when EMBEDDING_WORKER is on
+    EMBEDDING_WORKER_CONNECTIONS: int = 2
+    EMBEDDING_WORKER_TIMEOUT_SECONDS: float = 60.0
+    EMBEDDING_WORKER_SHM_MB: int = 8
+    EMBEDDING_WORKER_START_SECONDS: float = 30.0
+    EMBEDDING_WORKER_MAX_TIMEOUTS: int = 3  # consecutive timeouts before the worker is killed and restarted
+
+    # Staff certificate search
+    SEARCH_CANDIDATES: int = 200
+    SEARCH_INDEX_PAGE_SIZE: int = 1000
+    SEARCH_INDEX_RELOAD_SECONDS: int = 300  # catch up with writes made through other API workers
+    SEARCH_LEXICAL_WEIGHT: float = 0.3
+    SEARCH_MATCHES_PER_STUDENT: int = 10
+    SEARCH_ANN_BACKEND: str = "exact"  # "exact" or "ivf"
+    SEARCH_INDEX_DIR: str = "/tmp/aura_search_index"
+    SEARCH_IVF_MIN_ROWS: int = 5000
+    SEARCH_IVF_NLIST: int = 0  # 0 picks 4 * sqrt(rows)
+    SEARCH_IVF_NPROBE: int = 16
+    SEARCH_IVF_TRAIN_ITERATIONS: int = 10
+    SEARCH_IVF_COMPACT_RATIO: float = 0.2
+    EMBEDDING_STORAGE_DTYPE: str = "float16"  # "float16" or "int8"
+    QUERY_EMBEDDING_CACHE_SIZE: int = 1024
+    QUERY_EMBEDDING_CACHE_TTL_SECONDS: int = 3600
+    SEARCH_GROUPS_CACHE_SIZE: int = 128  # per-student candidate groups, shared by the pages of a query
+    SEARCH_GROUPS_CACHE_TTL_SECONDS: int = 60
+
+    # Staff leaderboard (in-process ranking per fakultas/prodi/angkatan)
+    LEADERBOARD_RELOAD_SECONDS: int = 300
+
+    # Cached leaderboard/search responses, invalidated by this process's certificate version
+    RESPONSE_CACHE_SIZE: int = 512
+    RESPONSE_CACHE_TTL_SECONDS: int = 60
+
+    # Executors for CPU-bound work kept off the event loop
+    EMBEDDING_THREADS: int = 2
+    PASSWORD_HASH_THREADS: int = 2
+
+    # OCR
+    OCR_PROCESSES: int = min(4, os.cpu_count() or 1)
+    OCR_MAX_PAGES: int = 10
+    OCR_DEADLINE_SECONDS: float = 60.0
+    OCR_DPI: int = 200
+    OCR_MIN_DPI: int = 100
+    OCR_GRAYSCALE: bool = True
+    OCR_PAGE_MEMORY_MB: int = 64
+
+    # Batch upload
+    BATCH_MAX_FILES: int = 100
+    BATCH_MAX_BYTES: int = 200 * 1024 * 1024
+    BATCH_OCR_CONCURRENCY: int = min(4, os.cpu_count() or 1)
+    BATCH_IO_CONCURRENCY: int = 8
+
+    # Groq client
+    GROQ_BASE_URL: Optional[str] = None
+    LLM_MAX_CONCURRENCY: int = 4
+    LLM_TIMEOUT_SECONDS: float = 15.0
+    LLM_MAX_RETRIES: int = 2
+    LLM_BACKOFF_SECONDS: float = 0.5
+    LLM_DEADLINE_SECONDS: float = 20.0  # whole call, retries and backoff included
+    LLM_BREAKER_FAILURES: int = 5
+    LLM_BREAKER_RESET_SECONDS: float = 30.0
+
+    # Certificate parse cache
+    PARSE_CACHE_SIZE: int = 2048
+    PARSE_CACHE_TTL_SECONDS: int = 3600
+    PARSE_CACHE_PATH: str = "/tmp/aura_parse_cache.sqlite3"
+    PARSE_CACHE_PERSIST_TTL_SECONDS: int = 60 * 60 * 24 * 30
+    PARSE_CACHE_MAX_ROWS: int = 50000
+    PARSE_CACHE_PRUNE_EVERY: int = 500  # writes between prunes of the SQLite tier
+
+    class Config:
+        env_file = str(env_path)
+        extra = "ignore"
+
+service_settings = ServiceSettings()
@@ -1,9 +1,11 @@
 import os
 from datetime import datetime, timedelta, timezone
+from typing import Any, Dict
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import JWTError, jwt
 from app.config.database import get_db
+from app.services.executors import run_in_pool
 from pwdlib import PasswordHash
 
 # Config
@@ -53,7 +55,7 @@ async def login_user(username: str, password: str):
     if user_response.data:
         potential_user = user_response.data[0]
         
-        if verify_password(password, potential_user["password"]):
+        if await run_in_pool("password", verify_password, password, potential_user["password"]):
             user_data = potential_user
             role = "User"
 
@@ -63,7 +65,7 @@ async def login_user(username: str, password: str):
         staff_resp = db.table("Staff").select("*").eq("username", username).execute()
         if staff_resp.data:
             potential_staff = staff_resp.data[0]
-            if verify_password(password, potential_staff["password"]):
+            if await run_in_pool("password", verify_password, password, potential_staff["password"]):
                 user_data = potential_staff
                 role = "Staff"
 
@@ -115,6 +117,15 @@ async def verify_token_logic(credentials: HTTPAuthorizationCredentials = Depends
         )
 
 
+async def verify_staff_token_logic(payload: Dict[str, Any] = Depends(verify_token_logic)):
+    if payload.get("role") != "Staff":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Staff access required",
+        )
+    return payload
+
+
 async def refresh_access_token(refresh_token: str):
     try:
         payload = jwt.decode(refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
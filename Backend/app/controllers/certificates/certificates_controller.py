@@ -1,15 +1,29 @@
 from pathlib import Path
-import io, uuid, hashlib, re
+import io, uuid, hashlib, re, asyncio, time, logging, zipfile
+from contextlib import asynccontextmanager, nullcontext
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Callable, Tuple, Awaitable, AsyncIterator
 from fastapi import HTTPException, UploadFile
-from PIL import Image
-import pytesseract
-from pdf2image import convert_from_path
-from sentence_transformers import SentenceTransformer
-from groq import Groq
 
 from app.config.database import get_db
+from app.config.settings import service_settings
+from app.controllers.certificates.scoring import (
+    clean_ocr_text,
+    regex_parse_certificate,
+    normalize_parsed_data,
+    compute_spu_score
+)
+from app.services.ingestion_queue import IngestionQueue
+from app.services.ocr import ocr_document
+from app.services.file_hash_index import FileHashIndex
+from app.services.parse_cache import parse_cache
+from app.services.llm_client import AsyncLLMClient
+from app.services.metrics import register_metrics
+from app.services.embedding_service import embed_text
+from app.services.search_index import refresh_search_index
+from app.services.spu_aggregates import refresh_student
+from app.services.response_cache import bump_certificate_version
+from app.services.embedding_codec import encode_embedding
 
 import os, json, uuid
 from pathlib import Path
@@ -34,50 +48,239 @@ EMBEDDING_MODEL = config_settings.EMBEDDING_MODEL
 TESS_LANG = config_settings.TESS_LANG
 SUPABASE_BUCKET = config_settings.SUPABASE_BUCKET
 
+# Bump PARSE_PROMPT_VERSION whenever the prompt changes so cached parses are not reused
+GROQ_MODEL = "llama-3.1-8b-instant"
+PARSE_PROMPT_VERSION = "v1"
+
+BATCH_EXTENSIONS = {".pdf", ".png", ".jpg", ".jpeg"}
+
+CODE_FENCE_START = re.compile(r'^```(?:json)?\s*')
+CODE_FENCE_END = re.compile(r'\s*```$')
+
 # Initialize services
-groq_client = Groq(api_key=GROQ_API_KEY) if GROQ_API_KEY else None
-embedding_model = SentenceTransformer(EMBEDDING_MODEL)
+llm_client = AsyncLLMClient(api_key=GROQ_API_KEY) if GROQ_API_KEY else None
+if llm_client:
+    register_metrics("llm", llm_client.stats)
+file_hash_index = FileHashIndex()
+
+# One lock per OCR text hash, held from the duplicate check to the insert, so two
+# uploads with the same text (e.g. the .pdf and .jpg of one certificate in a batch)
+# cannot both pass the check before either row exists
+text_hash_locks: Dict[str, asyncio.Lock] = {}
+text_hash_users: Dict[str, int] = {}
+
+@asynccontextmanager
+async def text_hash_lock(text_hash: str):
+    lock = text_hash_locks.setdefault(text_hash, asyncio.Lock())
+    text_hash_users[text_hash] = text_hash_users.get(text_hash, 0) + 1
+    try:
+        async with lock:
+            yield
+    finally:
+        text_hash_users[text_hash] -= 1
+        if not text_hash_users[text_hash]:
+            del text_hash_users[text_hash]
+            del text_hash_locks[text_hash]
+
+class DuplicateCertificateError(HTTPException):
+    def __init__(self, document_id: str):
+        super().__init__(status_code=400, detail="Certificate already processed")
+        self.document_id = document_id
+        self.result = {"document_id": document_id, "duplicate": True}
 
 async def upload_certificate(file: UploadFile, student_id: str) -> Dict[str, Any]:
+    await file.seek(0)
+    content = await file.read()
+    return await process_certificate(content, file.filename, student_id)
+
+async def enqueue_certificate(file: UploadFile, student_id: str) -> Dict[str, Any]:
+    await file.seek(0)
+    content = await file.read()
+    return await ingestion_queue.submit(content, file.filename, student_id)
+
+async def get_ingestion_job(job_id: str, student_id: str) -> Dict[str, Any]:
+    job = ingestion_queue.status(job_id)
+    if not job or ingestion_queue.owner(job_id) != student_id:
+        raise HTTPException(status_code=404, detail="Upload job not found")
+    return job
+
+async def upload_certificates_batch(files: List[UploadFile], student_id: str) -> List[Dict[str, Any]]:
+    documents = await collect_batch_documents(files)
+    return await asyncio.gather(*run_batch_pipeline(documents, student_id))
+
+async def stream_certificates_batch(documents: List[Tuple[str, bytes]], student_id: str) -> AsyncIterator[Dict[str, Any]]:
+    # Takes documents already collected so upload errors are raised before the response starts
+    for item in asyncio.as_completed(run_batch_pipeline(documents, student_id)):
+        yield await item
+
+def run_batch_pipeline(documents: List[Tuple[str, bytes]], student_id: str) -> List[Awaitable[Dict[str, Any]]]:
+    # OCR is bounded by CPU, Groq and storage by outbound I/O
+    limits = {
+        "extract": asyncio.Semaphore(service_settings.BATCH_OCR_CONCURRENCY),
+        "parse": asyncio.Semaphore(service_settings.BATCH_IO_CONCURRENCY),
+        "store": asyncio.Semaphore(service_settings.BATCH_IO_CONCURRENCY),
+    }
+
+    first_seen: Dict[str, str] = {}
+    items = []
+    for filename, content in documents:
+        file_hash = sha256_bytes(content)
+        if file_hash in first_seen:
+            items.append(batch_duplicate_result(filename, first_seen[file_hash]))
+            continue
+        first_seen[file_hash] = filename
+        items.append(process_batch_item(filename, content, student_id, limits))
+    return items
+
+async def batch_duplicate_result(filename: str, original: str) -> Dict[str, Any]:
+    return {
+        "filename": filename,
+        "status": "duplicate",
+        "document_id": None,
+        "parsed": None,
+        "error": f"Same file as {original} in this batch",
+    }
+
+async def process_batch_item(
+    filename: str,
+    content: bytes,
+    student_id: str,
+    limits: Dict[str, asyncio.Semaphore]
+) -> Dict[str, Any]:
+    item = {"filename": filename, "status": "processed", "document_id": None, "parsed": None, "error": None}
+    try:
+        result = await process_certificate(content, filename, student_id, limits=limits)
+        item["document_id"] = result["document_id"]
+        item["parsed"] = result["parsed"]
+    except DuplicateCertificateError as e:
+        item["status"] = "duplicate"
+        item["document_id"] = e.document_id
+        item["error"] = e.detail
+    except HTTPException as e:
+        item["status"] = "failed"
+        item["error"] = str(e.detail)
+    except Exception as e:
+        logging.error(f"Batch upload of {filename} failed: {e}")
+        item["status"] = "failed"
+        item["error"] = str(e)
+    return item
+
+async def collect_batch_documents(files: List[UploadFile]) -> List[Tuple[str, bytes]]:
+    documents = []
+    total_bytes = 0
+    for file in files:
+        await file.seek(0)
+        content = await file.read()
+        if file.filename.lower().endswith('.zip'):
+            entries = await asyncio.to_thread(read_zip_documents, content)
+        else:
+            entries = [(file.filename, content)]
+
+        for filename, data in entries:
+            total_bytes += len(data)
+            documents.append((filename, data))
+            if len(documents) > service_settings.BATCH_MAX_FILES:
+                raise HTTPException(status_code=413, detail=f"A batch can contain at most {service_settings.BATCH_MAX_FILES} certificates")
+            if total_bytes > service_settings.BATCH_MAX_BYTES:
+                raise HTTPException(status_code=413, detail="Batch is too large")
+
+    if not documents:
+        raise HTTPException(status_code=400, detail="No certificate files found in upload")
+    return documents
+
+def read_zip_documents(content: bytes) -> List[Tuple[str, bytes]]:
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(content))
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail="Invalid zip archive")
+
+    documents = []
+    total_bytes = 0
+    with archive:
+        for info in archive.infolist():
+            name = os.path.basename(info.filename)
+            if info.is_dir() or not name or name.startswith('.') or info.filename.startswith('__MACOSX'):
+                continue
+            if os.path.splitext(name)[1].lower() not in BATCH_EXTENSIONS:
+                continue
+
+            # Check declared sizes before inflating anything
+            total_bytes += info.file_size
+            if len(documents) >= service_settings.BATCH_MAX_FILES or total_bytes > service_settings.BATCH_MAX_BYTES:
+                raise HTTPException(status_code=413, detail="Zip archive is too large")
+            documents.append((name, archive.read(info)))
+    return documents
+
+async def process_certificate(
+    content: bytes,
+    filename: str,
+    student_id: str,
+    on_stage: Optional[Callable[[str], None]] = None,
+    limits: Optional[Dict[str, asyncio.Semaphore]] = None
+) -> Dict[str, Any]:
+    report = on_stage or (lambda stage: None)
+    limits = limits or {}
+
+    # 0. Reject byte-identical re-uploads before paying for OCR
+    report("dedup")
+    file_hash = sha256_bytes(content)
+    existing_document_id = await asyncio.to_thread(file_hash_index.lookup, file_hash)
+    if existing_document_id:
+        raise DuplicateCertificateError(existing_document_id)
+
     # 1. Extract text from file
-    raw_text = await extract_text_from_file(file)
+    report("extract")
+    async with limits.get("extract", nullcontext()):
+        raw_text = await extract_text_from_file(content, filename)
     
     # 2. Clean OCR text
+    report("clean")
     cleaned_text = clean_ocr_text(raw_text)
     
     # 3. Generate SHA256 hash
+    report("hash")
     text_hash = sha256_text(cleaned_text)
     
-    # 4. Check if already processed
-    if await is_duplicate_certificate(text_hash):
-        raise HTTPException(status_code=400, detail="Certificate already processed")
-    
-    # 5. Parse with Groq AI
-    parsed_data = await groq_parse_certificate(cleaned_text)
+    async with text_hash_lock(text_hash):
+        # 4. Check if already processed
+        if await is_duplicate_certificate(text_hash):
+            file_hash_index.remember(file_hash, text_hash)
+            raise DuplicateCertificateError(text_hash)
+
+        # 5. Parse with Groq AI
+        report("parse")
+        async with limits.get("parse", nullcontext()):
+            parsed_data = await groq_parse_certificate(cleaned_text)
+
+        # 6. Upload file to Supabase storage
+        report("store")
+        async with limits.get("store", nullcontext()):
+            evidence_url = await upload_to_supabase_storage(content, filename)
+
+        # 7. Save initial data to database (status: processed)
+        certificate_data = {
+            "id": str(uuid.uuid4()),
+            "document_id": text_hash,
+            "student_id": student_id,
+            "evidence_url": evidence_url,
+            "raw_text_sha256": text_hash,
+            "file_sha256": file_hash,
+            "cleaned_text": cleaned_text,
+            "parsed": parsed_data,
+            "confidence_extraction": parsed_data.get("confidence", 0.8),
+            "status": "processed", 
+        }
+
+        await save_certificate_to_db(certificate_data)
+        file_hash_index.remember(file_hash, text_hash)
 
-    
-    # 6. Upload file to Supabase storage
-    evidence_url = await upload_to_supabase_storage(file)
-    
-    # 7. Save initial data to database (status: processed)
-    certificate_data = {
-        "id": str(uuid.uuid4()),
-        "document_id": text_hash,
-        "student_id": student_id,
-        "evidence_url": evidence_url,
-        "raw_text_sha256": text_hash,
-        "parsed": parsed_data,
-        "confidence_extraction": parsed_data.get("confidence", 0.8),
-        "status": "processed", 
-    }
-    
-    await save_certificate_to_db(certificate_data)
-    
     return {
         "document_id": text_hash,
         "parsed": parsed_data,
     }
 
+ingestion_queue = IngestionQueue(handler=process_certificate)
+
 async def complete_certificate(request: Dict[str, Any]) -> Dict[str, Any]:
     
     document_id = request["document_id"]
@@ -99,13 +302,14 @@ async def complete_certificate(request: Dict[str, Any]) -> Dict[str, Any]:
     normalized_data = normalize_parsed_data(parsed_data)
     spu_score = compute_spu_score(normalized_data, parsed_data)
     
-    # 2. Generate embedding from raw text
-    embedding = make_embedding(existing_data["raw_text_sha256"])
+    # 2. Generate embedding from the certificate text
+    embedding = await make_embedding(certificate_embedding_text({**existing_data, "parsed": parsed_data}))
     
     # 3. Update certificate with complete data (leave specified fields untouched)
     update_data = {
         "parsed": parsed_data,
-        "embedding": embedding,
+        # Only the packed form is written; search falls back to the JSON "embedding" column for legacy rows
+        "embedding_q": encode_embedding(embedding, service_settings.EMBEDDING_STORAGE_DTYPE),
         "before_normalized": {
             "rank_raw": parsed_data["rank_raw"],
             "level_raw": parsed_data["level_raw"],
@@ -125,6 +329,9 @@ async def complete_certificate(request: Dict[str, Any]) -> Dict[str, Any]:
         .update(update_data)\
         .eq("document_id", document_id)\
         .execute()
+    await refresh_search_index(existing_data["id"])
+    await refresh_student(existing_data.get("student_id"))
+    bump_certificate_version()
     
     return {
         "document_id": document_id,
@@ -133,38 +340,16 @@ async def complete_certificate(request: Dict[str, Any]) -> Dict[str, Any]:
         "after_normalized": update_data["after_normalized"],
     }
 
-async def extract_text_from_file(file: UploadFile) -> str:
+async def extract_text_from_file(content: bytes, filename: str) -> str:
     """Extract text from PDF or image using OCR"""
-    await file.seek(0)
-    content = await file.read()
-    
-    if file.filename.endswith('.pdf'):
-        # Save temporarily and convert PDF to images
-        with open("temp.pdf", "wb") as f:
-            f.write(content)
-        images = convert_from_path("temp.pdf")
-        os.remove("temp.pdf")
-        
-        text = ""
-        for img in images:
-            text += pytesseract.image_to_string(img, lang=TESS_LANG)
-        return text
-    
-    else:
-        # Handle image files
-        image = Image.open(io.BytesIO(content))
-        return pytesseract.image_to_string(image, lang=TESS_LANG)
-
-def clean_ocr_text(raw_text: str) -> str:
-    # Remove extra whitespace and normalize
-    text = re.sub(r'\s+', ' ', raw_text).strip()
-    # Remove common OCR artifacts
-    text = re.sub(r'[^\w\s.,!?\-\d]', '', text)
-    return text
+    return await ocr_document(content, filename, TESS_LANG)
 
 def sha256_text(text: str) -> str:
     return hashlib.sha256(text.encode()).hexdigest()
 
+def sha256_bytes(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
 async def is_duplicate_certificate(text_hash: str) -> bool:
     db = get_db()
     result = db.table("certificates").select("id").eq("raw_text_sha256", text_hash).execute()
@@ -172,10 +357,16 @@ async def is_duplicate_certificate(text_hash: str) -> bool:
 
 async def groq_parse_certificate(raw_text: str, use_fallback: bool = True) -> Dict[str, Any]:
     """Parse certificate using Groq API with fallback to regex"""
-    if not groq_client:
+    if not llm_client:
         if use_fallback:
             return regex_parse_certificate(raw_text)
         raise HTTPException(status_code=500, detail="Groq API not configured")
+
+    cache_key = parse_cache.make_key(sha256_text(raw_text), GROQ_MODEL, PARSE_PROMPT_VERSION)
+    # The disk tier is SQLite, so lookups stay off the event loop
+    cached = await asyncio.to_thread(parse_cache.get, cache_key)
+    if cached is not None:
+        return cached
     
     prompt = f"""
 Extract structured information from this certificate text.
@@ -204,17 +395,18 @@ Respond with JSON only:
 """
     
     try:
-        response = groq_client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
-            model="llama-3.1-8b-instant",
+        started = time.perf_counter()
+        content = await llm_client.complete(
+            prompt,
+            model=GROQ_MODEL,
             temperature=0.0,
-            max_tokens=1200,
-            timeout=30
+            max_tokens=1200
         )
+        parse_cache.record_llm_call(time.perf_counter() - started)
         
-        content = response.choices[0].message.content.strip()
-        content = re.sub(r'^```json\\s*', '', content)
-        content = re.sub(r'\s*```$', '', content)
+        content = content.strip()
+        content = CODE_FENCE_START.sub('', content)
+        content = CODE_FENCE_END.sub('', content)
         parsed = json.loads(content.strip())
 
         required_fields = ["nama_mahasiswa", "event_name", "rank_raw", "level_raw"]
@@ -225,6 +417,8 @@ Respond with JSON only:
         if "confidence" not in parsed:
             parsed["confidence"] = 0.7
 
+        # Only LLM results are cached; regex fallbacks should be retried next time
+        await asyncio.to_thread(parse_cache.set, cache_key, parsed)
         return parsed
     
     except Exception as e:
@@ -232,81 +426,21 @@ Respond with JSON only:
             return regex_parse_certificate(raw_text)
         raise HTTPException(status_code=500, detail=f"Error parsing certificate: {str(e)}")
 
-def normalize_parsed_data(parsed: Dict[str, Any]) -> Dict[str, Any]:
-    return {
-        "rank_norm": norm_rank(parsed.get("rank_raw", "")),
-        "level_norm": norm_level(parsed.get("level_raw", "")),
-        "category_norm": norm_category(parsed.get("category_raw", ""))
-    }
+def certificate_embedding_text(certificate: Dict[str, Any]) -> str:
+    """Text a certificate is embedded from: its cleaned OCR text, or the parsed fields for rows stored before it was kept"""
+    if certificate.get("cleaned_text"):
+        return certificate["cleaned_text"]
+    parsed = certificate.get("parsed") or {}
+    fields = ["event_name", "rank_raw", "level_raw", "category_raw", "domain_raw"]
+    return " ".join(str(parsed[f]) for f in fields if parsed.get(f))
 
-def regex_parse_certificate(raw_text: str) -> Dict[str, Any]:
-    parsed = {
-        "nama_mahasiswa": "Nama Tidak Terbaca",
-        "event_name": "Unknown Event",
-        "rank_raw": "Unknown",
-        "level_raw": "Unknown",
-        "date_issued": None,
-        "category_raw": "Unknown",
-        "domain_raw": "Unknown",
-        "confidence": 0.5
-    }
+async def make_embedding(text: str) -> List[float]:
+    return await embed_text(text, EMBEDDING_MODEL)
 
-    text = raw_text.lower()
-
-    # Extract student name
-    nama_patterns = [
-        r"(?:nama|name)[:\\s-]*([A-Z][a-zA-Z\\s]{5,50})",
-        r"(?:diberikan kepada|presented to|awarded to)[:\\s-]*([A-Z][a-zA-Z\\s]{5,50})"
-    ]
-    for pattern in nama_patterns:
-        match = re.search(pattern, raw_text, re.IGNORECASE)
-        if match:
-            parsed["nama_mahasiswa"] = match.group(1).strip()
-            break
-
-    # Extract rank
-    if re.search(r"\\b(juara\\s*1|juara\\s*pertama|1st|first|champion|gold)\\b", text):
-        parsed["rank_raw"] = "Juara 1"
-    elif re.search(r"\\b(juara\\s*2|juara\\s*kedua|2nd|second|silver)\\b", text):
-        parsed["rank_raw"] = "Juara 2"
-    elif re.search(r"\\b(juara\\s*3|juara\\s*ketiga|3rd|third|bronze)\\b", text):
-        parsed["rank_raw"] = "Juara 3"
-
-    # Extract level
-    if re.search(r"\\b(international|internasional)\\b", text):
-        parsed["level_raw"] = "Internasional"
-    elif re.search(r"\\b(nasional|national)\\b", text):
-        parsed["level_raw"] = "Nasional"
-
-    return parsed
-
-def compute_spu_score(normalized: Dict[str, Any], parsed: Dict[str, Any]) -> float:
-    base_score = (
-        (normalized.get("rank_norm", 0) / 5) * 0.4 +
-        (normalized.get("level_norm", 0) / 5) * 0.35 +
-        (normalized.get("category_norm", 0) / 2) * 0.15
-    )
-
-    confidence = float(parsed.get("confidence", 0.7))
-    confidence_factor = 0.9 + (confidence * 0.2)
-
-    domain = str(parsed.get("domain_raw", "")).lower()
-    domain_bonus = 0.05 if domain in [
-        "ai", "teknologi", "sains", "engineering"
-    ] else 0.0
-
-    final_score = (base_score * confidence_factor) + domain_bonus
-    return round(min(final_score, 1.0), 4)
-
-def make_embedding(text: str) -> List[float]:
-    return embedding_model.encode(text).tolist()
-
-async def upload_to_supabase_storage(file: UploadFile) -> str:
+async def upload_to_supabase_storage(file_content: bytes, filename: str) -> str:
     db = get_db()
-    await file.seek(0)
-    file_content = await file.read()
 
-    ext = os.path.splitext(file.filename)[1]
+    ext = os.path.splitext(filename)[1]
     date = datetime.utcnow().strftime('%Y%m%d')
     remote_path = f"uploads/{date}_{uuid.uuid4().hex}{ext}"
     
@@ -319,48 +453,10 @@ async def upload_to_supabase_storage(file: UploadFile) -> str:
 async def save_certificate_to_db(certificate_data: Dict[str, Any]) -> None:
     db = get_db()
     db.table("certificates").insert(certificate_data).execute()
+    await refresh_search_index(certificate_data["id"])
+    await refresh_student(certificate_data.get("student_id"))
+    bump_certificate_version()
 
 async def update_certificate_to_db(certificate_data: Dict[str, Any]) -> None:
     db = get_db()
     db.table("certificates").update(certificate_data).eq("document_id", certificate_data["document_id"]).execute()
-
-def norm_rank(rank: str) -> int:
-    s = str(rank).lower()
-    if re.search(r"(juara\\s*(1|i\\b)|1st|first|champion|gold|emas)", s):
-        return 5
-    if re.search(r"(juara\\s*(2|ii\\b)|2nd|second|silver|perak)", s):
-        return 4
-    if re.search(r"(juara\\s*(3|iii\\b)|3rd|third|bronze|perunggu)", s):
-        return 3
-    if "final" in s:
-        return 2
-    return 1
-
-def norm_level(level: str) -> int:
-    s = str(level).lower()
-    if "internasional" in s or "international" in s:
-        return 5
-    if "nasional" in s:
-        return 4
-    if "provinsi" in s:
-        return 3
-    if "kota" in s or "kabupaten" in s:
-        return 2
-    return 1
-
-def norm_category(category: str) -> int:
-    s = str(category).lower()
-    if "akademik" in s:
-        return 2
-    return 1
-
-def normalize_parsed_data(parsed: Dict[str, Any]) -> Dict[str, Any]:
-    return {
-        "rank_norm": norm_rank(parsed.get("rank_raw", "")),
-        "level_norm": norm_level(parsed.get("level_raw", "")),
-        "category_norm": norm_category(parsed.get("category_raw", ""))
-    }
-
-async def save_certificate_to_db(certificate_data: Dict[str, Any]) -> None:
-    db = get_db()
-    db.table("certificates").insert(certificate_data).execute()
\ No newline at end of file
@@ -0,0 +1,184 @@
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Match, NamedTuple, Optional, Tuple
+
+
+class Rule(NamedTuple):
+    field: str
+    value: Any
+    pattern: str
+
+
+class RuleEngine:
+    """Evaluates a table of rules, each precompiled once.
+
+    Rules are tried with `search` in the order listed and the first match
+    for a field wins, which keeps the priority of the old if/elif cascades.
+    Rules are not merged into one alternation: a single finditer pass
+    consumes text as it goes, so a lower rule could swallow the span a
+    higher one needed.
+    """
+
+    def __init__(self, rules: List[Rule], flags: int = 0, word_boundary: bool = False):
+        self.rules = rules
+        self.patterns = [
+            re.compile(rf"\b(?:{rule.pattern})\b" if word_boundary else rule.pattern, flags)
+            for rule in rules
+        ]
+
+    def evaluate(self, text: str) -> Dict[str, Tuple[Any, Match]]:
+        found: Dict[str, Tuple[Any, Match]] = {}
+        for rule, pattern in zip(self.rules, self.patterns):
+            if rule.field in found:
+                continue
+            match = pattern.search(text)
+            if match:
+                found[rule.field] = (rule.value, match)
+        return found
+
+    def first(self, text: str, default: Any) -> Any:
+        found = self.evaluate(text)
+        return next(iter(found.values()))[0] if found else default
+
+
+NAME_VALUE = r"(?P<v{i}>[A-Z][a-zA-Z\s]{{5,50}})"
+
+# Names span many words, so they get their own pass instead of swallowing rank/level keywords
+NAME_RULES = RuleEngine([
+    Rule("nama_mahasiswa", 0, r"(?:nama|name)[:\s-]*" + NAME_VALUE.format(i=0)),
+    Rule("nama_mahasiswa", 1, r"(?:diberikan kepada|presented to|awarded to)[:\s-]*" + NAME_VALUE.format(i=1)),
+], flags=re.IGNORECASE)
+
+# Applied to lowercased text
+KEYWORD_RULES = RuleEngine([
+    # Rank
+    Rule("rank_raw", "Juara 1", r"juara\s*1|juara\s*pertama|1st|first|champion|gold"),
+    Rule("rank_raw", "Juara 2", r"juara\s*2|juara\s*kedua|2nd|second|silver"),
+    Rule("rank_raw", "Juara 3", r"juara\s*3|juara\s*ketiga|3rd|third|bronze"),
+    # Level
+    Rule("level_raw", "Internasional", r"international|internasional"),
+    Rule("level_raw", "Nasional", r"nasional|national"),
+], word_boundary=True)
+
+RANK_RULES = RuleEngine([
+    Rule("rank_norm", 5, r"juara\s*(?:1|i\b)|1st|first|champion|gold|emas"),
+    Rule("rank_norm", 4, r"juara\s*(?:2|ii\b)|2nd|second|silver|perak"),
+    Rule("rank_norm", 3, r"juara\s*(?:3|iii\b)|3rd|third|bronze|perunggu"),
+    Rule("rank_norm", 2, r"final"),
+])
+
+LEVEL_RULES = RuleEngine([
+    Rule("level_norm", 5, r"internasional|international"),
+    Rule("level_norm", 4, r"nasional"),
+    Rule("level_norm", 3, r"provinsi"),
+    Rule("level_norm", 2, r"kota|kabupaten"),
+])
+
+CATEGORY_RULES = RuleEngine([
+    # Must come before "akademik", which it contains
+    Rule("category_norm", 1, r"non[\s-]*akademik"),
+    Rule("category_norm", 2, r"akademik"),
+])
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+OCR_ARTIFACT_PATTERN = re.compile(r'[^\w\s.,!?\-\d]')
+
+SPU_DOMAINS = {"ai", "teknologi", "sains", "engineering"}
+
+
+def clean_ocr_text(raw_text: str) -> str:
+    # Remove extra whitespace and normalize
+    text = WHITESPACE_PATTERN.sub(' ', raw_text).strip()
+    # Remove common OCR artifacts
+    return OCR_ARTIFACT_PATTERN.sub('', text)
+
+
+def regex_parse_certificate(raw_text: str) -> Dict[str, Any]:
+    parsed = {
+        "nama_mahasiswa": "Nama Tidak Terbaca",
+        "event_name": "Unknown Event",
+        "rank_raw": "Unknown",
+        "level_raw": "Unknown",
+        "date_issued": None,
+        "category_raw": "Unknown",
+        "domain_raw": "Unknown",
+        "confidence": 0.5
+    }
+
+    names = NAME_RULES.evaluate(raw_text)
+    if names:
+        value, match = names["nama_mahasiswa"]
+        parsed["nama_mahasiswa"] = match.group(f"v{value}").strip()
+
+    for field, (value, match) in KEYWORD_RULES.evaluate(raw_text.lower()).items():
+        parsed[field] = value
+
+    return parsed
+
+
+# The raw rank/level/category values come from a small vocabulary, so results are memoized.
+# Values come from a user-editable parsed dict and may be unhashable, so they are
+# turned into strings before reaching the cache.
+@lru_cache(maxsize=4096)
+def _norm_rank(rank: str) -> int:
+    return RANK_RULES.first(rank, 1)
+
+
+@lru_cache(maxsize=4096)
+def _norm_level(level: str) -> int:
+    return LEVEL_RULES.first(level, 1)
+
+
+@lru_cache(maxsize=4096)
+def _norm_category(category: str) -> int:
+    return CATEGORY_RULES.first(category, 1)
+
+
+def norm_rank(rank: Any) -> int:
+    return _norm_rank(str(rank).lower())
+
+
+def norm_level(level: Any) -> int:
+    return _norm_level(str(level).lower())
+
+
+def norm_category(category: Any) -> int:
+    return _norm_category(str(category).lower())
+
+
+def normalize_parsed_data(parsed: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "rank_norm": norm_rank(parsed.get("rank_raw", "")),
+        "level_norm": norm_level(parsed.get("level_raw", "")),
+        "category_norm": norm_category(parsed.get("category_raw", ""))
+    }
+
+
+def compute_spu_score(normalized: Dict[str, Any], parsed: Dict[str, Any]) -> float:
+    base_score = (
+        (normalized.get("rank_norm", 0) / 5) * 0.4 +
+        (normalized.get("level_norm", 0) / 5) * 0.35 +
+        (normalized.get("category_norm", 0) / 2) * 0.15
+    )
+
+    confidence = float(parsed.get("confidence", 0.7))
+    confidence_factor = 0.9 + (confidence * 0.2)
+
+    domain = str(parsed.get("domain_raw", "")).lower()
+    domain_bonus = 0.05 if domain in SPU_DOMAINS else 0.0
+
+    final_score = (base_score * confidence_factor) + domain_bonus
+    return round(min(final_score, 1.0), 4)
+
+
+def score_parsed_data(parsed: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Recompute after_normalized for a stored parse, as complete_certificate does"""
+    if not isinstance(parsed, dict):
+        return None
+    normalized = normalize_parsed_data(parsed)
+    return {
+        "rank_norm": normalized.get("rank_norm", 0),
+        "spu_score": compute_spu_score(normalized, parsed),
+        "level_norm": normalized.get("level_norm", 0),
+        "category_norm": normalized.get("category_norm", 0)
+    }
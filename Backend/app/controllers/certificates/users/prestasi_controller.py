@@ -2,7 +2,8 @@ from typing import Dict, Any, List
 from app.config.database import get_db
 from fastapi import HTTPException
 from datetime import datetime
-from collections import Counter
+from app.services.certificate_stats import load_certificate_frame, value_counts
+import asyncio
 
 async def get_user_profile_data(user_id: str) -> Dict[str, Any]:
     """Get user profile data from Users table"""
@@ -55,44 +56,17 @@ async def get_top_certificates(user_id: str, limit: int = 3) -> List[Dict[str, A
 
 async def get_certificate_statistics(user_id: str) -> Dict[str, Any]:
     """Get certificate statistics including counts and unique domains"""
-    db = get_db()
-    
-    # Get all certificates for user
-    result = db.table("certificates").select("parsed, before_normalized, after_normalized").eq("student_id", user_id).execute()
-    
-    akademik_count = 0
-    non_akademik_count = 0
-    domain_counter = Counter()
-    avg_spu = 0.0
+    frame = await asyncio.to_thread(
+        load_certificate_frame, ["category_raw", "domain_raw", "spu_score"], student_id=[user_id]
+    )
+    category_counts = value_counts(frame, "category_raw")
 
-    
-    for cert in result.data:
-        parsed = cert.get("parsed", {})
-        before_normalized = cert.get("before_normalized", {})
-        after_normalized = cert.get("after_normalized", {})
-        
-        # Count academic vs non-academic
-        category_raw = before_normalized.get("category_raw", "")
-        if category_raw.lower() == "akademik":
-            akademik_count += 1
-        elif category_raw.lower() == "non-akademik":
-            non_akademik_count += 1
-        
-        # Count Domains
-        domain_raw = parsed.get("domain_raw")
-        if domain_raw:
-            domain_counter[domain_raw] += 1
-
-        # Count SPU Score
-        spu_score = after_normalized.get("spu_score", 0.0) * 100
-        avg_spu += spu_score
-    
     return {
-        "akademik_count": akademik_count,
-        "non_akademik_count": non_akademik_count,
-        "domain_counts": dict(domain_counter),
-        "total_certificates": len(result.data),
-        "avg_spu": avg_spu / len(result.data) if result.data else 0.0
+        "akademik_count": category_counts.get("akademik", 0),
+        "non_akademik_count": category_counts.get("non-akademik", 0),
+        "domain_counts": value_counts(frame, "domain_raw"),
+        "total_certificates": len(frame),
+        "avg_spu": float(frame["spu_score"].mean() * 100) if len(frame) else 0.0
     }
 
 
@@ -1,5 +1,8 @@
 from typing import Dict, Any, List
 from app.config.database import get_db
+from app.services.search_index import refresh_search_index
+from app.services.spu_aggregates import refresh_student
+from app.services.response_cache import bump_certificate_version
 from fastapi import HTTPException
 from datetime import datetime
 
@@ -39,7 +42,7 @@ async def validate_certificate(certificate_id: str, staff_id: str) -> Dict[str,
     db = get_db()
     
     # Check if certificate exists and has status 'processed'
-    result = db.table("certificates").select("id, status").eq("id", certificate_id).execute()
+    result = db.table("certificates").select("id, status, student_id").eq("id", certificate_id).execute()
     
     if not result.data:
         raise HTTPException(status_code=404, detail="Certificate not found")
@@ -57,6 +60,9 @@ async def validate_certificate(certificate_id: str, staff_id: str) -> Dict[str,
     }
     
     db.table("certificates").update(update_data).eq("id", certificate_id).execute()
+    await refresh_search_index(certificate_id)
+    await refresh_student(certificate.get("student_id"))
+    bump_certificate_version()
     
     # Return updated certificate data
     updated_result = db.table("certificates").select("id, status, parsed").eq("id", certificate_id).execute()
@@ -2,8 +2,9 @@ from typing import Dict, Any, List
 from unittest import result
 from app.config.database import get_db
 from fastapi import HTTPException
+from app.services.certificate_stats import load_certificate_frame, top_students, value_counts
 from datetime import datetime
-import math
+import asyncio
 
 async def get_staff_profile_data(staff_id: str) -> Dict[str, Any]:
     db = get_db()
@@ -23,39 +24,16 @@ async def get_staff_profile_data(staff_id: str) -> Dict[str, Any]:
 
 
 async def get_certificate_status_counts() -> Dict[str, int]:
-    db = get_db()
-    
-    validated_count = 0
-    processed_count = 0
-    kampus_count = 0
-    nasional_count = 0
-    internasional_count = 0
-
-    result = db.table("certificates").select("status", "parsed").execute()
-    for r in result.data:
-        status = (r.get("status") or "").lower()
-
-        if status == "validated":
-            validated_count += 1
-        elif status == "processed":
-            processed_count += 1
+    frame = await asyncio.to_thread(load_certificate_frame, ["status", "level_raw"])
+    status_counts = value_counts(frame, "status")
+    level_counts = value_counts(frame, "level_raw")
 
-        parsed = r.get("parsed") or {}
-        level = (parsed.get("level_raw") or "").lower()
-
-        if level == "kampus":
-            kampus_count += 1
-        elif level == "nasional":
-            nasional_count += 1
-        elif level == "internasional":
-            internasional_count += 1
-    
     return {
-        "validated_count": validated_count,
-        "processed_count": processed_count,
-        "kampus_count" : kampus_count,
-        "nasional_count" : nasional_count,
-        "internasional_count" : internasional_count,
+        "validated_count": status_counts.get("validated", 0),
+        "processed_count": status_counts.get("processed", 0),
+        "kampus_count" : level_counts.get("kampus", 0),
+        "nasional_count" : level_counts.get("nasional", 0),
+        "internasional_count" : level_counts.get("internasional", 0),
     }
 
 
@@ -119,82 +97,24 @@ async def get_recent_certificates() -> List[Dict[str, Any]]:
     return certificates
 
 async def get_top_students_by_spu(limit: int = 5) -> List[Dict[str, Any]]:
-    db = get_db()
-    
-    # Get all certificates with student_id and after_normalized
-    result = db.table("certificates").select("student_id, after_normalized").execute()
-    
-    # Calculate total SPU score and certificate count per student
-    student_stats = {}
-    for cert in result.data:
-        student_id = cert["student_id"]
-        after_normalized = cert.get("after_normalized", {})
-        spu_score = after_normalized.get("spu_score", 0.0)
-        
-        if student_id not in student_stats:
-            student_stats[student_id] = {"total_spu": 0.0, "count": 0}
-        
-        student_stats[student_id]["total_spu"] += spu_score
-        student_stats[student_id]["count"] += 1
-    
-    # Calculate weighted scores and get top students
-    top_students = []
-    
-    # Calculate weighted score for all students first
-    scored_students = []
-    for student_id, stats in student_stats.items():
-        if not student_id:
-            continue
-            
-        total_spu = stats["total_spu"]
-        count = stats["count"]
-        
-        # Weighted score formula: total_spu * (1 + 0.1 * ln(1 + count))
-        weighted_score = total_spu * (1 + 0.1 * math.log(1 + count))
-        
-        scored_students.append({
-            "student_id": student_id,
-            "weighted_score": weighted_score,
-            "total_spu": total_spu,
-            "count": count
-        })
-    
-    # Sort by weighted score descending
-    scored_students.sort(key=lambda x: x["weighted_score"], reverse=True)
-    
-    # Get details for top N students
-    for student_entry in scored_students[:limit]:
-        student_id = student_entry["student_id"]
-        
-        # Get student details
-        user_result = db.table("Users").select("nama, nim, prodi").eq("id", student_id).execute()
-        
-        if user_result.data:
-            student_data = user_result.data[0]
-            top_students.append({
-                "nama": student_data.get("nama", ""),
-                "nim": student_data.get("nim", ""),
-                "prodi": student_data.get("prodi", ""),
-                "total_score": round(student_entry["weighted_score"], 2), 
-                "avg_score": round(student_entry["weighted_score"] / student_entry["count"], 2) if student_entry["count"] else 0
-            })
-    
-    return top_students
-
-async def get_certificate_count_by_fakultas() -> Dict[str, int]:
-    db = get_db()
-
-    # Join certificates with Users to get fakultas in one query
-    result = (
-        db.table("certificates")
-        .select("student_id, Users!inner(fakultas)")
-        .execute()
+    # Student details come embedded with each certificate instead of one Users query per student
+    frame = await asyncio.to_thread(
+        load_certificate_frame, ["student_id", "spu_score", "nama", "nim", "prodi"], inner_users=True
     )
+    top = top_students(frame, limit)
+
+    return [
+        {
+            "nama": student.nama or "",
+            "nim": student.nim or "",
+            "prodi": student.prodi or "",
+            "total_score": round(student.weighted_score, 2),
+            "avg_score": round(student.weighted_score / student.certificate_count, 2) if student.certificate_count else 0
+        }
+        for student in top.itertuples()
+    ]
 
-    # Count certificates per fakultas
-    count_by_fakultas = {}
-    for cert in result.data:
-        fakultas = cert.get("Users", {}).get("fakultas", "Unknown")
-        count_by_fakultas[fakultas] = count_by_fakultas.get(fakultas, 0) + 1
-
-    return count_by_fakultas
\ No newline at end of file
+async def get_certificate_count_by_fakultas() -> Dict[str, int]:
+    frame = await asyncio.to_thread(load_certificate_frame, ["student_id", "fakultas"], inner_users=True)
+    frame["fakultas"] = frame["fakultas"].fillna("Unknown")
+    return value_counts(frame, "fakultas")
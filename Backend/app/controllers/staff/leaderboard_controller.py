@@ -1,264 +1,277 @@
-from typing import Dict, Any, List, Optional
-from app.config.database import get_db
+from typing import Dict, Any, List, Optional, Tuple
+from app.config.settings import service_settings
+from app.services.embedding_service import embed_text
+from app.services.search_index import reload_search_index_if_stale, search_index
+from app.services.spu_aggregates import leaderboard_period, leaderboard_top
+from app.services.cache import TTLCache
+from app.services.metrics import register_metrics
+from app.services.response_cache import certificate_version
 from fastapi import HTTPException
 import numpy as np
-from scipy.spatial.distance import cosine
-from sentence_transformers import SentenceTransformer
+import asyncio
+import base64
+import hashlib
+import heapq
+import json
 import logging
 import math
 
-try:
-    embed_model = SentenceTransformer('all-mpnet-base-v2')
-except Exception as e:
-    logging.warning(f"Could not load SentenceTransformer: {e}")
-    embed_model = None
-
-async def get_leaderboard_aggregated(limit: int = 10) -> List[Dict[str, Any]]:
-    db = get_db()
+async def get_leaderboard_aggregated(
+    limit: int = 10,
+    fakultas: Optional[str] = None,
+    prodi: Optional[str] = None,
+    angkatan: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    # Totals are kept per student on every certificate write and ranked per
+    # fakultas/prodi/angkatan in memory (see spu_aggregates), so a page is a slice
+    rows, _ = await leaderboard_top(limit, fakultas=fakultas, prodi=prodi, angkatan=angkatan)
 
-    res = db.table("certificates").select(
-        "student_id, after_normalized, Users(nama, nim)"
-    ).in_("status", ["validated", "processed"]).execute()
+    return [
+        {
+            "student_id": r["student_id"],
+            "nama_mahasiswa": r.get("nama", "Unknown"),
+            "nim": r.get("nim", "Unknown"),
+            "fakultas": r.get("fakultas"),
+            "prodi": r.get("prodi"),
+            "angkatan": r.get("angkatan"),
+            "total_spu": r["total_spu"],
+            "certificate_count": r["certificate_count"],
+            "weighted_score": r["weighted_score"],
+            "avg_spu": round(r["total_spu"] / r["certificate_count"], 2) if r["certificate_count"] else 0.0,
+        }
+        for r in rows
+    ]
 
-    if not res.data:
-        return []
 
-    data = {}
+async def get_leaderboard_period(
+    period: str = "semester",
+    limit: int = 10,
+    fakultas: Optional[str] = None,
+    prodi: Optional[str] = None,
+    angkatan: Optional[str] = None,
+) -> Dict[str, Any]:
+    # Windows are merged from per-student daily buckets (see spu_aggregates)
+    try:
+        return await leaderboard_period(period, limit, fakultas=fakultas, prodi=prodi, angkatan=angkatan)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    for r in res.data:
-        user_data = r.get("Users")
-        if not user_data:
-            continue
-            
-        if isinstance(user_data, list):
-            if not user_data: continue
-            user_info = user_data[0]
-        else:
-            user_info = user_data
-            
-        nama = user_info.get("nama", "Unknown")
-        nim = user_info.get("nim", "Unknown")
-        student_id = r.get("student_id")
-        
-        key = student_id if student_id else nama
-        
-        if key not in data:
-            data[key] = {
-                "student_id": student_id,
-                "nama_mahasiswa": nama,
-                "nim": nim,
-                "total_spu": 0.0,
-                "certificate_count": 0
-            }
 
-        try:
-            after_norm = r.get("after_normalized") or {}
-            spu = float(after_norm.get("spu_score", 0.0))
-        except (ValueError, TypeError):
-            spu = 0.0
-            
-        data[key]["total_spu"] += spu
-        data[key]["certificate_count"] += 1
+query_embedding_cache = TTLCache(
+    service_settings.QUERY_EMBEDDING_CACHE_SIZE,
+    service_settings.QUERY_EMBEDDING_CACHE_TTL_SECONDS,
+)
+register_metrics("query_embedding_cache", query_embedding_cache.stats)
 
-    leaderboard = list(data.values())
+search_groups_cache = TTLCache(
+    service_settings.SEARCH_GROUPS_CACHE_SIZE,
+    service_settings.SEARCH_GROUPS_CACHE_TTL_SECONDS,
+)
+register_metrics("search_groups_cache", search_groups_cache.stats)
 
-    for entry in leaderboard:
-        total_spu = entry["total_spu"]
-        count = entry["certificate_count"]
-        
-        weighted_score = total_spu * (1 + 0.1 * math.log(1 + count))
-        
-        entry["weighted_score"] = round(weighted_score, 2)
-        entry["total_spu"] = round(total_spu, 2)
-        entry["avg_spu"] = round(total_spu / count, 2) if count else 0.0
 
-    # Sort by weighted_score descending
-    leaderboard.sort(key=lambda x: x["weighted_score"], reverse=True)
+def normalize_query_text(text: str) -> str:
+    return " ".join(text.lower().split())
 
-    return leaderboard[:limit]
 
+async def make_embedding(text: str) -> Optional[List[float]]:
+    # Staff repeat the same few queries all day, so their vectors are cached per model
+    text = normalize_query_text(text)
+    key = (service_settings.SEARCH_EMBEDDING_MODEL, text)
+    cached = query_embedding_cache.get(key)
+    if cached is not None:
+        return list(cached)
 
-def make_embedding(text: str) -> Optional[List[float]]:
-    if embed_model is None:
-        return None
     try:
-        vec = embed_model.encode(text)
-        return vec.tolist()
+        embedding = await embed_text(text, service_settings.SEARCH_EMBEDDING_MODEL)
     except Exception as e:
         logging.error(f"Error generating embedding: {e}")
         return None
 
+    query_embedding_cache.set(key, tuple(embedding))
+    return embedding
 
-async def search_certificates_similarity(
-    query: str, 
-    limit: int = 10,
-    weights: Dict[str, float] = {'similarity': 0.9, 'spu': 0.1},
-) -> List[Dict[str, Any]]:
 
-    if not query:
-        return []
-
-    db = get_db()
-    
-    query_vec = make_embedding(query)
-    query_vec_np = np.array(query_vec).flatten() if query_vec else None
-
-    # Fetch all candidates (validated/processed)
-    select_str = """
-        id,
-        student_id,
-        embedding,
-        after_normalized,
-        parsed,
-        evidence_url,
-        status,
-        Users (
-            nama,
-            nim
-        )
-    """
-    
+def search_match_entry(record: Dict[str, Any], sim: float, weights: Dict[str, float]) -> Dict[str, Any]:
+    spu_score = record["spu_score"]
+    final_score = (
+        weights['similarity'] * sim +
+        weights['spu'] * spu_score
+    )
+    return {
+        "id": record["id"],
+        "student_id": record["student_id"],
+        "student_name": record["student_name"],
+        "student_nim": record["student_nim"],
+        "event_name": record["event_name"] or "Unknown",
+        "level": record["level_raw"],
+        "domain": record["domain_raw"] or "Unknown",
+        "category": record["category_raw"] or "Unknown",
+        "evidence_url": record["evidence_url"],
+        "relevance_score": round(sim, 4),
+        "spu_score": round(spu_score, 4),
+        "final_score": round(final_score, 4)
+    }
+
+
+def encode_search_cursor(query: str, best_score: float, student_id: Any) -> str:
+    payload = {"q": query_fingerprint(query), "score": best_score, "sid": student_id}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_search_cursor(cursor: str, query: str) -> Tuple[float, str]:
     try:
-        res = db.table("certificates").select(select_str).in_("status", ["validated", "processed"]).execute()
-    except Exception as e:
-        logging.error(f"Database query error: {e}")
-        return []
-
-    records = res.data
-    if not records:
-        return []
-
-    raw_matches = []
-    
-    use_semantic = query_vec_np is not None
-
-    for r in records:
-        try:
-            # Check embedding existence
-            emb = r.get("embedding")
-            
-            sim = 0.0
-                        
-            has_embedding = False
-            if use_semantic and emb:
-                # Parse embedding
-                if isinstance(emb, str):
-                    import json
-                    try:
-                        emb = json.loads(emb)
-                    except:
-                        emb = None
-                
-                if emb:
-                    emb_vec = np.array(emb).flatten()
-                    if emb_vec.shape[0] == query_vec_np.shape[0]:
-                        sim = 1 - cosine(query_vec_np, emb_vec)
-                        has_embedding = True
-            
-            # check for text match boost
-            parsed = r.get("parsed") or {}
-            event_name = parsed.get("event_name", "") or ""
-            category = parsed.get("category_raw", "") or ""
-            domain = parsed.get("domain_raw", "") or ""
-            
-            text_match = False
-            if query.lower() in event_name.lower():
-                text_match = True
-            elif query.lower() in str(category).lower():
-                text_match = True
-            elif query.lower() in str(domain).lower():
-                text_match = True
-                
-            # If no embedding and no text match, skip
-            if not has_embedding and not text_match:
-                continue
-                
-            # If text match but no embedding, give a base similarity score
-            if not has_embedding and text_match:
-                sim = 0.5 # Base score for text match
-            
-            # Extract SPU score from after_normalized
-            after_norm = r.get("after_normalized") or {}
-            spu_score = float(after_norm.get("spu_score", 0.0))
-            
-            final_score = (
-                weights['similarity'] * sim +
-                weights['spu'] * spu_score
-            )
-            
-            # Extract event info
-            event_info = {
-                "event_name": event_name if event_name else "Unknown",
-                "level_raw": parsed.get("level_raw", "Unknown"),
-                "domain_raw": domain if domain else "Unknown",
-                "category_raw": category if category else "Unknown"
-            }
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if payload["q"] != query_fingerprint(query):
+            raise ValueError("cursor belongs to another query")
+        return float(payload["score"]), str(payload["sid"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {e}")
 
-            # Extract user info
-            student_name = "Unknown"
-            student_nim = "Unknown"
-            user_data = r.get("Users")
-            if isinstance(user_data, list) and user_data:
-                student_name = user_data[0].get("nama", "Unknown")
-                student_nim = user_data[0].get("nim", "Unknown")
-            elif isinstance(user_data, dict):
-                student_name = user_data.get("nama", "Unknown")
-                student_nim = user_data.get("nim", "Unknown")
-
-            valid_entry = {
-                "id": r.get("id"), 
-                "student_id": r.get("student_id"),
-                "student_name": student_name,
-                "student_nim": student_nim,
-                "event_name": event_info.get("event_name", "Unknown"),
-                "level": event_info.get("level_raw", "Unknown"),
-                "domain": event_info.get("domain_raw", "Unknown"),
-                "category": event_info.get("category_raw", "Unknown"),
-                "evidence_url": r.get("evidence_url"),
-                "relevance_score": round(sim, 4),
-                "spu_score": round(spu_score, 4),
-                "final_score": round(final_score, 4)
-            }
-            raw_matches.append(valid_entry)
 
-        except Exception as e:
-            logging.warning(f"Error processing row in similarity search: {e}")
+def query_fingerprint(query: str) -> str:
+    return hashlib.sha256(normalize_query_text(query).encode()).hexdigest()[:16]
+
+
+def student_order(group: Dict[str, Any]) -> Tuple[float, str]:
+    # best_score descending, ties broken by student id so pages never overlap
+    return (-group["best_score"], str(group["student_id"]))
+
+
+async def search_candidates(query: str) -> Dict[str, float]:
+    """Relevance of every candidate certificate, blending semantic and lexical scores"""
+    query_vec = await make_embedding(query)
+    query_vec_np = np.array(query_vec, dtype=np.float32).flatten() if query_vec else None
+
+    # 1. Semantic candidates: top-N by cosine over the in-memory matrix
+    similarities: Dict[str, float] = {}
+    if query_vec_np is not None:
+        for cert_id, sim in search_index.search(query_vec_np, service_settings.SEARCH_CANDIDATES):
+            similarities[cert_id] = sim
+
+    # 2. Lexical candidates: BM25 over the parsed fields, scaled to 0..1 by the best hit
+    lexical = search_index.lexical_search(query)
+    lexical = dict(heapq.nlargest(service_settings.SEARCH_CANDIDATES, lexical.items(), key=lambda item: item[1]))
+    top_lexical = max(lexical.values(), default=0.0)
+    for cert_id in lexical:
+        lexical[cert_id] /= top_lexical
+        if cert_id not in similarities and query_vec_np is not None:
+            sim = search_index.similarity(cert_id, query_vec_np)
+            if sim is not None:
+                similarities[cert_id] = sim
+
+    # 3. Blend both signals on one scale; a row without an embedding has no similarity, not a full score
+    if query_vec_np is None:
+        # No query vector at all: every row is ranked on the lexical score alike
+        return lexical
+    lexical_weight = service_settings.SEARCH_LEXICAL_WEIGHT
+    return {
+        cert_id: (1 - lexical_weight) * similarities.get(cert_id, 0.0) + lexical_weight * lexical.get(cert_id, 0.0)
+        for cert_id in similarities.keys() | lexical.keys()
+    }
+
+
+async def search_groups(query: str, weights: Dict[str, float]) -> List[Dict[str, Any]]:
+    """Every matching student with their score and best matches, computed once per query and certificate version"""
+    key = (normalize_query_text(query), tuple(sorted(weights.items())), certificate_version.current())
+    cached = search_groups_cache.get(key)
+    if cached is not None:
+        return cached
+
+    relevance = await search_candidates(query)
+
+    # Group by student, keeping running totals and only the best few matches each
+    per_student = service_settings.SEARCH_MATCHES_PER_STUDENT
+    grouped: Dict[Any, Dict[str, Any]] = {}
+    for cert_id, sim in relevance.items():
+        # Records are kept with the match: a concurrent refresh may drop the id from the index
+        record = search_index.get(cert_id)
+        if record is None:
             continue
 
-    # Group by student
-    grouped = {}
-    for m in raw_matches:
-        sid = m["student_id"]
-        if sid not in grouped:
-            grouped[sid] = {
+        sid = record["student_id"]
+        group = grouped.get(sid)
+        if group is None:
+            group = grouped[sid] = {
                 "student_id": sid,
-                "student_name": m["student_name"],
-                "student_nim": m["student_nim"],
+                "student_name": record["student_name"],
+                "student_nim": record["student_nim"],
                 "best_score": 0.0,
                 "weighted_sum": 0.0,
-                "matches": []
+                "count": 0,
+                "heap": [],
             }
-        
-        grouped[sid]["matches"].append(m)
-        
+
         # Calculate contribution: similarity * spu_score
-        contribution = m["relevance_score"] * m["spu_score"]
-        grouped[sid]["weighted_sum"] += contribution
-
-    # Calculate final best_score using the formula
-    for sid, data in grouped.items():
-        count = len(data["matches"])
-        if count > 0:
-            # Formula: total_weighted_spu * (1 + 0.1 * ln(1 + count))
-            log_boost = 1 + 0.1 * math.log(1 + count)
-            data["best_score"] = round(data["weighted_sum"] * log_boost, 2)
-
-    # Convert to list and sort by best_score desc
-    results = list(grouped.values())
-    results.sort(key=lambda x: x["best_score"], reverse=True)
-    
-    # Sort matches within each student
-    for res in results:
-        res["matches"].sort(key=lambda x: x["final_score"], reverse=True)
-
-    return results[:limit]
\ No newline at end of file
+        group["weighted_sum"] += round(sim, 4) * round(record["spu_score"], 4)
+        group["count"] += 1
+
+        # cert_id is unique within a heap, so records themselves are never compared
+        final_score = weights['similarity'] * sim + weights['spu'] * record["spu_score"]
+        item = (final_score, cert_id, sim, record)
+        if len(group["heap"]) < per_student:
+            heapq.heappush(group["heap"], item)
+        else:
+            heapq.heappushpop(group["heap"], item)
+
+    groups = list(grouped.values())
+    for group in groups:
+        # Formula: total_weighted_spu * (1 + 0.1 * ln(1 + count))
+        log_boost = 1 + 0.1 * math.log(1 + group["count"])
+        group["best_score"] = round(group["weighted_sum"] * log_boost, 2)
+        group["heap"].sort(reverse=True)
+
+    search_groups_cache.set(key, groups)
+    return groups
+
+
+async def search_certificates_page(
+    query: str,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    weights: Dict[str, float] = {'similarity': 0.9, 'spu': 0.1},
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """One page of students ranked for a query, plus the cursor of the next page (None on the last)"""
+
+    if not query or limit < 1:
+        return [], None
+    after = decode_search_cursor(cursor, query) if cursor else None
+
+    try:
+        await search_index.ensure_loaded()
+    except Exception as e:
+        logging.error(f"Database query error: {e}")
+        return [], None
+    reload_search_index_if_stale()
+
+    # Later pages reuse the first page's grouping instead of re-running the candidate pass
+    groups = await search_groups(query, weights)
+
+    # Bounded selection of this page; one extra row tells whether another page exists
+    eligible = iter(groups)
+    if after is not None:
+        eligible = (g for g in eligible if student_order(g) > (-after[0], after[1]))
+    page = heapq.nsmallest(limit + 1, eligible, key=student_order)
+
+    next_cursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        next_cursor = encode_search_cursor(query, page[-1]["best_score"], page[-1]["student_id"])
+
+    results = []
+    for group in page:
+        # Cached groups are shared between requests, so each page builds its own dicts
+        result = {field: value for field, value in group.items() if field not in ("count", "heap")}
+        result["matches"] = [search_match_entry(record, sim, weights) for _, _, sim, record in group["heap"]]
+        results.append(result)
+
+    return results, next_cursor
+
+
+async def search_certificates_similarity(
+    query: str, 
+    limit: int = 10,
+    weights: Dict[str, float] = {'similarity': 0.9, 'spu': 0.1},
+) -> List[Dict[str, Any]]:
+    results, _ = await search_certificates_page(query, limit, weights=weights)
+    return results
@@ -1,9 +1,20 @@
-from fastapi import FastAPI
+import logging
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.v1.auth import auth
 from app.api.v1.users import dashboard, prestasi, certificate
 from app.api.v1.staff import certificate as certificatestaff, dashboard as dashboardstaff, leaderboard
+from app.api.v1.system import metrics
+from app.config.settings import service_settings
+from app.controllers.certificates.certificates_controller import ingestion_queue, EMBEDDING_MODEL
+from app.services.model_registry import model_registry
+from app.services.background import spawn
+from app.services.executors import run_in_pool, shutdown_executors
+from app.services.search_index import load_search_index
+from app.services.spu_aggregates import reload_leaderboard_index
+from app.services.embedding_worker import embedding_worker_client
+from app.services.embedding_service import embed_text
 
 app = FastAPI(
     title="AURA API",
@@ -17,6 +28,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 # Auth Routes
@@ -32,6 +44,48 @@ app.include_router(dashboardstaff.router, prefix="/api/v1")
 app.include_router(certificatestaff.router, prefix="/api/v1")
 app.include_router(leaderboard.router, prefix="/api/v1")
 
+# System Routes
+app.include_router(metrics.router, prefix="/api/v1")
+
+@app.on_event("startup")
+async def startup():
+    await ingestion_queue.start()
+    spawn(load_search_index())
+    spawn(reload_leaderboard_index())
+
+    # Models load in the background so / answers while they warm up
+    if service_settings.MODEL_WARMUP:
+        spawn(warmup_models([EMBEDDING_MODEL, service_settings.SEARCH_EMBEDDING_MODEL]))
+
+async def warmup_models(names):
+    if not service_settings.EMBEDDING_WORKER:
+        await run_in_pool("embedding", model_registry.warmup, names)
+        return
+
+    # The worker process owns the models; one encode per model loads them there
+    for name in dict.fromkeys(names):
+        try:
+            await embed_text("warmup", name)
+        except Exception as e:
+            logging.warning(f"Could not warm up model {name} in the embedding worker: {e}")
+            model_registry.warmup_errors[name] = str(e)
+        else:
+            model_registry.warmup_errors.pop(name, None)
+    model_registry.warmed_up = not model_registry.warmup_errors
+
+@app.on_event("shutdown")
+async def shutdown():
+    await ingestion_queue.stop()
+    embedding_worker_client.close()
+    shutdown_executors()
+
 @app.get("/")
 async def root():
-    return {"message": "AURA API is running"}
\ No newline at end of file
+    return {"message": "AURA API is running"}
+
+@app.get("/ready")
+async def ready(response: Response):
+    ready = model_registry.warmed_up or not service_settings.MODEL_WARMUP
+    if not ready:
+        response.status_code = 503
+    return {"ready": ready, "failures": model_registry.warmup_errors, "models": model_registry.stats()}
\ No newline at end of file
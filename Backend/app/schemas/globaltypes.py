@@ -18,6 +18,7 @@ class LeaderboardEntry(BaseModel):
     rank: int = Field(ge=1, description="Leaderboard rank")
     certificates_count: int = Field(ge=0, description="Number of certificates")
     last_achievement: Optional[date] = None
+    weighted_score: Optional[float] = Field(default=None, ge=0, description="Ranking score: total_spu * (1 + 0.1 * ln(1 + certificates_count))")
 
 class LeaderboardSPU(BaseModel):
     period: str 
@@ -0,0 +1,212 @@
+import json
+import logging
+import math
+import os
+import shutil
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+ASSIGN_CHUNK_ROWS = 8192
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def assign_to_centroids(matrix: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    # Chunked so a large matrix never materialises the full rows x nlist product
+    labels = np.empty(matrix.shape[0], dtype=np.int32)
+    for start in range(0, matrix.shape[0], ASSIGN_CHUNK_ROWS):
+        chunk = matrix[start:start + ASSIGN_CHUNK_ROWS]
+        labels[start:start + ASSIGN_CHUNK_ROWS] = np.argmax(chunk @ centroids.T, axis=1)
+    return labels
+
+
+def train_centroids(matrix: np.ndarray, nlist: int, iterations: int, seed: int = 0) -> np.ndarray:
+    """Spherical k-means on a sample of the (already normalized) rows"""
+    rng = np.random.default_rng(seed)
+    sample_size = min(matrix.shape[0], nlist * 64)
+    sample = matrix[rng.choice(matrix.shape[0], sample_size, replace=False)]
+    centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        labels = assign_to_centroids(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        empty = np.bincount(labels, minlength=nlist) == 0
+        # Re-seed empty lists so every centroid keeps a share of the data
+        sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+        centroids = normalize_rows(sums)
+    return centroids.astype(np.float32)
+
+
+class IVFFlatIndex:
+    """Inverted-file index over normalized vectors.
+
+    Rows are stored grouped by their nearest k-means centroid, so a query
+    only scans the nprobe lists whose centroids are closest to it. Saved
+    builds are plain .npy files opened with mmap_mode, so every worker on
+    the host shares the same pages and a restart does not retrain.
+    """
+
+    FILES = ("centroids", "vectors", "offsets", "ids")
+
+    def __init__(
+        self,
+        centroids: np.ndarray,
+        vectors: np.ndarray,
+        offsets: np.ndarray,
+        ids: np.ndarray,
+        meta: Dict[str, Any],
+    ):
+        self.centroids = centroids
+        self.vectors = vectors
+        self.offsets = offsets
+        self.ids = ids
+        self.meta = meta
+        self.id_rows = {str(item_id): row for row, item_id in enumerate(ids)}
+        self.deleted = np.zeros(len(ids), dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def nlist(self) -> int:
+        return self.centroids.shape[0]
+
+    @property
+    def live(self) -> int:
+        return len(self.ids) - int(self.deleted.sum())
+
+    @classmethod
+    def build(
+        cls,
+        ids: Sequence[str],
+        matrix: np.ndarray,
+        nlist: int = 0,
+        iterations: int = 10,
+        meta: Optional[Dict[str, Any]] = None,
+    ) -> "IVFFlatIndex":
+        matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        if nlist <= 0:
+            nlist = int(4 * math.sqrt(matrix.shape[0]))
+        nlist = max(1, min(nlist, matrix.shape[0]))
+
+        started = time.perf_counter()
+        centroids = train_centroids(matrix, nlist, iterations)
+        labels = assign_to_centroids(matrix, centroids)
+        order = np.argsort(labels, kind="stable")
+        offsets = np.zeros(nlist + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(labels, minlength=nlist))
+
+        meta = dict(meta or {})
+        meta.update({
+            "rows": int(matrix.shape[0]),
+            "dim": int(matrix.shape[1]),
+            "nlist": nlist,
+            "build_seconds": round(time.perf_counter() - started, 2),
+            "built_at": time.time(),
+        })
+        return cls(centroids, matrix[order], offsets, np.asarray(ids)[order].astype(str), meta)
+
+    def save(self, directory: str) -> str:
+        """Write a new build next to the current one and switch CURRENT to it atomically"""
+        os.makedirs(directory, exist_ok=True)
+        build_id = uuid.uuid4().hex
+        build_dir = os.path.join(directory, build_id)
+        os.makedirs(build_dir)
+        for name in self.FILES:
+            np.save(os.path.join(build_dir, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(build_dir, "meta.json"), "w") as f:
+            json.dump(self.meta, f)
+
+        pointer = os.path.join(directory, f"CURRENT.{build_id}")
+        with open(pointer, "w") as f:
+            f.write(build_id)
+        os.replace(pointer, os.path.join(directory, "CURRENT"))
+
+        # Workers still mapping an old build keep their pages until they reload
+        for entry in os.listdir(directory):
+            path = os.path.join(directory, entry)
+            if entry != build_id and os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+        return build_dir
+
+    @classmethod
+    def load(cls, directory: str) -> Optional["IVFFlatIndex"]:
+        try:
+            with open(os.path.join(directory, "CURRENT")) as f:
+                build_dir = os.path.join(directory, f.read().strip())
+            with open(os.path.join(build_dir, "meta.json")) as f:
+                meta = json.load(f)
+            arrays = {
+                name: np.load(os.path.join(build_dir, f"{name}.npy"), mmap_mode="r")
+                for name in cls.FILES
+            }
+        except (OSError, ValueError) as e:
+            logging.info(f"No saved search index in {directory}: {e}")
+            return None
+        return cls(meta=meta, **arrays)
+
+    def mark_deleted(self, item_id: str) -> None:
+        row = self.id_rows.get(item_id)
+        if row is not None:
+            self.deleted[row] = True
+
+    def contains(self, item_id: str) -> bool:
+        row = self.id_rows.get(item_id)
+        return row is not None and not self.deleted[row]
+
+    def search(self, query: np.ndarray, k: int, nprobe: int) -> List[Tuple[str, float]]:
+        if k <= 0 or len(self.ids) == 0:
+            return []
+
+        nprobe = max(1, min(nprobe, self.nlist))
+        centroid_sims = self.centroids @ query
+        probe = np.argpartition(-centroid_sims, nprobe - 1)[:nprobe] if nprobe < self.nlist else range(self.nlist)
+
+        rows, sims = [], []
+        for c in probe:
+            start, end = int(self.offsets[c]), int(self.offsets[c + 1])
+            if start == end:
+                continue
+            rows.append(np.arange(start, end))
+            sims.append(self.vectors[start:end] @ query)
+        if not rows:
+            return []
+
+        rows = np.concatenate(rows)
+        sims = np.concatenate(sims)
+        live = ~self.deleted[rows]
+        rows, sims = rows[live], sims[live]
+
+        if k < len(rows):
+            top = np.argpartition(-sims, k - 1)[:k]
+        else:
+            top = np.arange(len(rows))
+        top = top[np.argsort(-sims[top])]
+        return [(str(self.ids[rows[i]]), float(sims[i])) for i in top]
+
+    def similarity(self, item_id: str, query: np.ndarray) -> Optional[float]:
+        row = self.id_rows.get(item_id)
+        if row is None or self.deleted[row]:
+            return None
+        return float(self.vectors[row] @ query)
+
+    def live_items(self) -> Tuple[List[str], np.ndarray]:
+        live = np.flatnonzero(~self.deleted)
+        return [str(self.ids[row]) for row in live], np.asarray(self.vectors[live])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rows": len(self.ids),
+            "deleted": int(self.deleted.sum()),
+            "nlist": self.nlist,
+            "built_at": self.meta.get("built_at"),
+            "model": self.meta.get("model"),
+        }
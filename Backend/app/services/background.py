@@ -0,0 +1,19 @@
+import asyncio
+import logging
+from typing import Any, Coroutine, Set
+
+# The event loop only keeps weak references to tasks, so fire-and-forget work is held here until it finishes
+background_tasks: Set[asyncio.Task] = set()
+
+
+def _finished(task: asyncio.Task) -> None:
+    background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logging.error(f"Background task {task.get_name()} failed: {task.exception()}")
+
+
+def spawn(coro: Coroutine[Any, Any, Any]) -> asyncio.Task:
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(_finished)
+    return task
@@ -0,0 +1,131 @@
+"""Columnar aggregates over the certificates table.
+
+Rows come back from PostgREST with their JSON fields already flattened
+(``spu_score:after_normalized->spu_score``), are loaded into one DataFrame,
+and every count, per-student sum and weighted score is computed on the
+columns instead of walking row dicts with ``.get()`` chains.
+"""
+from operator import itemgetter
+from typing import Any, Dict, Iterable, Iterator, List
+
+import numpy as np
+import pandas as pd
+
+from app.config.database import get_db
+
+# alias -> PostgREST select expression on the certificates table
+CERTIFICATE_FIELDS = {
+    "id": "id",
+    "student_id": "student_id",
+    "status": "status",
+    "created_at": "created_at",
+    "spu_score": "spu_score:after_normalized->spu_score",
+    "level_raw": "level_raw:parsed->>level_raw",
+    "domain_raw": "domain_raw:parsed->>domain_raw",
+    "category_raw": "category_raw:before_normalized->>category_raw",
+}
+# Read from the embedded Users row of each certificate
+USER_FIELDS = ("nama", "nim", "prodi", "fakultas", "angkatan")
+# Counted case-insensitively
+LOWERCASE_FIELDS = ("status", "level_raw", "category_raw")
+
+
+def keyset_pages(table: str, columns: str, key: str, page_size: int, **filters: List[Any]) -> Iterator[Dict[str, Any]]:
+    db = get_db()
+    last = None
+    while True:
+        query = db.table(table).select(columns).order(key).limit(page_size)
+        for column, values in filters.items():
+            query = query.in_(column, values)
+        if last is not None:
+            query = query.gt(key, last)
+        page = query.execute().data
+        if not page:
+            return
+        yield from page
+        last = page[-1][key]
+
+
+def select_columns(fields: List[str], inner_users: bool = False) -> str:
+    columns = [CERTIFICATE_FIELDS[f] for f in fields if f in CERTIFICATE_FIELDS]
+    user_fields = [f for f in fields if f in USER_FIELDS]
+    if user_fields:
+        columns.append(f"Users{'!inner' if inner_users else ''}({', '.join(user_fields)})")
+    return ", ".join(columns)
+
+
+def certificate_frame(rows: List[Dict[str, Any]], fields: List[str]) -> pd.DataFrame:
+    """One column per field: float64 spu_score, everything else as object columns"""
+    def column(values: Iterable[Any]) -> pd.Series:
+        # Kept as object: string inference would copy every value and turn None into NaN
+        return pd.Series(np.fromiter(values, dtype=object, count=len(rows)), dtype=object, copy=False)
+
+    # PostgREST returns every selected key, so columns are pulled out with C-level itemgetters
+    columns: Dict[str, Any] = {}
+    for field in fields:
+        if field == "spu_score":
+            values = pd.to_numeric(column(map(itemgetter(field), rows)), errors="coerce")
+            columns[field] = values.fillna(0.0).astype(np.float64)
+        elif field in CERTIFICATE_FIELDS:
+            columns[field] = column(map(itemgetter(field), rows))
+
+    user_fields = [f for f in fields if f in USER_FIELDS]
+    if user_fields:
+        users = [((u[0] if u else None) if isinstance(u, list) else u) or {} for u in map(itemgetter("Users"), rows)]
+        for field in user_fields:
+            columns[field] = column(u.get(field) for u in users)
+    return pd.DataFrame(columns, columns=[f for f in fields if f in columns], copy=False)
+
+
+def load_certificate_frame(
+    fields: List[str],
+    page_size: int = 1000,
+    inner_users: bool = False,
+    **filters: List[Any],
+) -> pd.DataFrame:
+    rows = list(keyset_pages("certificates", select_columns(["id", *fields], inner_users), "id", page_size, **filters))
+    return certificate_frame(rows, fields)
+
+
+def weighted_scores(total_spu: np.ndarray, count: np.ndarray) -> np.ndarray:
+    # Formula: total_spu * (1 + 0.1 * ln(1 + count))
+    return total_spu * (1 + 0.1 * np.log1p(count))
+
+
+def student_totals(frame: pd.DataFrame) -> pd.DataFrame:
+    """One row per student_id: total_spu, certificate_count, weighted_score and any user fields in the frame"""
+    # Codes follow first appearance, so sums are bincounts instead of a hash groupby per column
+    codes, students = pd.factorize(frame["student_id"])
+    known = codes >= 0
+    codes = codes[known]
+    total_spu = np.bincount(codes, weights=frame["spu_score"].to_numpy()[known], minlength=len(students))
+    certificate_count = np.bincount(codes, minlength=len(students))
+
+    totals = pd.DataFrame(
+        {"total_spu": total_spu, "certificate_count": certificate_count},
+        index=pd.Index(students, name="student_id"),
+    )
+    user_fields = [f for f in USER_FIELDS if f in frame]
+    if user_fields:
+        # Writing rows in reverse leaves each student's first row index behind
+        first_row = np.empty(len(students), dtype=np.int64)
+        first_row[codes[::-1]] = np.flatnonzero(known)[::-1]
+        for field in user_fields:
+            totals[field] = pd.Series(frame[field].to_numpy()[first_row], index=totals.index, dtype=object)
+    totals["weighted_score"] = weighted_scores(total_spu, certificate_count)
+    return totals[totals.index != ""]
+
+
+def top_students(frame: pd.DataFrame, limit: int) -> pd.DataFrame:
+    return student_totals(frame).nlargest(limit, "weighted_score", keep="first")
+
+
+def value_counts(frame: pd.DataFrame, field: str) -> Dict[str, int]:
+    """Count of each non-empty value of a column, case-folded for LOWERCASE_FIELDS"""
+    counts: Dict[str, int] = {}
+    # Counted on the raw values first so only the distinct labels get lower-cased
+    for value, count in frame[field].value_counts(dropna=True).items():
+        key = str(value).lower() if field in LOWERCASE_FIELDS else str(value)
+        if key:
+            counts[key] = counts.get(key, 0) + int(count)
+    return counts
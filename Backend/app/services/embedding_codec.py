@@ -0,0 +1,83 @@
+import base64
+import binascii
+import json
+import struct
+from typing import Any, Optional, Sequence, Union
+
+import numpy as np
+
+# version, dtype code, dimension; int8 payloads are preceded by a float32 scale
+HEADER = struct.Struct("<BBH")
+SCALE = struct.Struct("<f")
+FORMAT_VERSION = 1
+
+DTYPE_CODES = {"float16": 1, "int8": 2}
+CODE_DTYPES = {code: name for name, code in DTYPE_CODES.items()}
+
+
+def encode_embedding(vector: Union[Sequence[float], np.ndarray], dtype: str = "float16") -> str:
+    """Pack an embedding as base64(header + float16 values | scale + int8 values)"""
+    if dtype not in DTYPE_CODES:
+        raise ValueError(f"Unsupported embedding dtype {dtype}")
+    values = np.asarray(vector, dtype=np.float32).ravel()
+    header = HEADER.pack(FORMAT_VERSION, DTYPE_CODES[dtype], values.shape[0])
+
+    if dtype == "float16":
+        payload = values.astype("<f2").tobytes()
+    else:
+        # Symmetric per-vector scale so the largest component maps to +/-127
+        peak = float(np.abs(values).max()) if values.size else 0.0
+        scale = peak / 127 if peak else 1.0
+        quantized = np.clip(np.rint(values / scale), -127, 127).astype(np.int8)
+        payload = SCALE.pack(scale) + quantized.tobytes()
+
+    return base64.b64encode(header + payload).decode("ascii")
+
+
+def decode_embedding(value: Any) -> Optional[np.ndarray]:
+    """float32 vector from an encoded string, or from a legacy JSON list / JSON string"""
+    if value is None:
+        return None
+    if isinstance(value, str) and not value.startswith("["):
+        try:
+            raw = base64.b64decode(value, validate=True)
+        except (binascii.Error, ValueError):
+            return None
+        return decode_embedding_bytes(raw)
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return None
+    vector = np.asarray(value, dtype=np.float32).ravel()
+    return vector if vector.size else None
+
+
+def decode_embedding_bytes(raw: bytes) -> Optional[np.ndarray]:
+    if len(raw) < HEADER.size:
+        return None
+    version, code, dim = HEADER.unpack_from(raw)
+    if version != FORMAT_VERSION or code not in CODE_DTYPES or dim == 0:
+        return None
+
+    # np.frombuffer views the decoded bytes in place; only the float32 widening copies
+    if CODE_DTYPES[code] == "float16":
+        if len(raw) != HEADER.size + 2 * dim:
+            return None
+        return np.frombuffer(raw, dtype="<f2", count=dim, offset=HEADER.size).astype(np.float32)
+
+    if len(raw) != HEADER.size + SCALE.size + dim:
+        return None
+    (scale,) = SCALE.unpack_from(raw, HEADER.size)
+    quantized = np.frombuffer(raw, dtype=np.int8, count=dim, offset=HEADER.size + SCALE.size)
+    return quantized.astype(np.float32) * np.float32(scale)
+
+
+def encoded_dtype(value: str) -> Optional[str]:
+    try:
+        raw = base64.b64decode(value[:8], validate=True)
+    except (binascii.Error, ValueError):
+        return None
+    if len(raw) < HEADER.size:
+        return None
+    return CODE_DTYPES.get(HEADER.unpack_from(raw)[1])
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config.settings import service_settings
+from app.services.embedding_worker import embedding_worker_client
+from app.services.executors import run_in_pool
+from app.services.metrics import Histogram, register_metrics
+from app.services.model_registry import get_embedding_model
+
+
+def encode_batch(model_name: str, texts: List[str]) -> List[List[float]]:
+    model = get_embedding_model(model_name)
+    return model.encode(texts, batch_size=len(texts)).tolist()
+
+
+class EmbeddingBatcher:
+    """Collects concurrent encode requests for one model into micro-batches.
+
+    A batch is flushed when it reaches max_batch_size or when the oldest
+    request has waited max_wait_ms, whichever comes first.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        max_batch_size: int = service_settings.EMBEDDING_MAX_BATCH,
+        max_wait_ms: float = service_settings.EMBEDDING_MAX_WAIT_MS,
+    ):
+        self.model_name = model_name
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.batch_sizes = Histogram([1, 2, 4, 8, 16, 32, 64, 128])
+        self.latency = Histogram([0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5])
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _ensure_running(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task is None or self._task.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._run(self._queue))
+        return self._queue
+
+    async def embed(self, text: str) -> List[float]:
+        queue = self._ensure_running()
+        future = asyncio.get_running_loop().create_future()
+        await queue.put((text, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self, queue: asyncio.Queue) -> List[Tuple[str, asyncio.Future, float]]:
+        loop = asyncio.get_running_loop()
+        batch = [await queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self, queue: asyncio.Queue) -> None:
+        while True:
+            batch = await self._collect(queue)
+            pending = [(text, future, queued_at) for text, future, queued_at in batch if not future.done()]
+            if not pending:
+                continue
+
+            self.batch_sizes.observe(len(pending))
+            texts = [text for text, _, _ in pending]
+            try:
+                if service_settings.EMBEDDING_WORKER:
+                    vectors = await embedding_worker_client.encode(self.model_name, texts)
+                else:
+                    vectors = await run_in_pool("embedding", encode_batch, self.model_name, texts)
+            except Exception as e:
+                logging.error(f"Embedding batch of {len(pending)} failed: {e}")
+                for _, future, _ in pending:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            finished = time.perf_counter()
+            for (_, future, queued_at), vector in zip(pending, vectors):
+                self.latency.observe(finished - queued_at)
+                if not future.done():
+                    future.set_result(vector)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "batch_size": self.batch_sizes.snapshot(),
+            "latency_seconds": self.latency.snapshot(),
+        }
+
+
+_batchers: Dict[str, EmbeddingBatcher] = {}
+
+
+def get_batcher(model_name: str) -> EmbeddingBatcher:
+    batcher = _batchers.get(model_name)
+    if batcher is None:
+        batcher = _batchers[model_name] = EmbeddingBatcher(model_name)
+    return batcher
+
+
+async def embed_text(text: str, model_name: str) -> List[float]:
+    return await get_batcher(model_name).embed(text)
+
+
+register_metrics("embeddings", lambda: {name: b.stats() for name, b in _batchers.items()})
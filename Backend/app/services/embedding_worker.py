@@ -0,0 +1,295 @@
+"""Host-wide embedding worker.
+
+One process per host owns the models; every API worker talks to it over a
+Unix socket (multiprocessing.connection) and receives vectors through a
+shared memory block it created for its connection, so only the small
+control messages are pickled. The first API worker that cannot connect
+starts the server under a file lock, which is also how a crashed server
+comes back; a hung one is killed after EMBEDDING_WORKER_MAX_TIMEOUTS
+consecutive timeouts so the next connect replaces it. The socket lives in a
+directory only this user can enter and connections need
+EMBEDDING_WORKER_AUTHKEY.
+
+    python -m app.services.embedding_worker
+"""
+import asyncio
+import fcntl
+import itertools
+import logging
+import os
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+from multiprocessing.connection import Client, Connection, Listener
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.config.settings import service_settings
+from app.services.executors import run_in_pool
+from app.services.metrics import register_metrics
+
+BACKEND_ROOT = Path(__file__).resolve().parents[2]
+
+
+class WorkerUnavailableError(RuntimeError):
+    pass
+
+
+class WorkerTimeoutError(WorkerUnavailableError):
+    pass
+
+
+def _authkey() -> bytes:
+    if not service_settings.EMBEDDING_WORKER_AUTHKEY:
+        raise WorkerUnavailableError("EMBEDDING_WORKER_AUTHKEY must be set to use the embedding worker")
+    return service_settings.EMBEDDING_WORKER_AUTHKEY.encode()
+
+
+def _private_dir(address: str) -> None:
+    """Create the socket's directory as 0700 and refuse one another user could write to"""
+    directory = os.path.dirname(address) or "."
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    info = os.stat(directory)
+    if info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise WorkerUnavailableError(f"Embedding worker directory {directory} must be owned by this user with mode 0700")
+
+
+def _peer_pid(conn: Connection) -> Optional[int]:
+    # The server's pid as the kernel reports it for this socket, so no pid file is needed
+    try:
+        sock = socket.socket(fileno=os.dup(conn.fileno()))
+        with sock:
+            pid, uid, _ = struct.unpack("3i", sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")))
+    except (OSError, AttributeError):
+        return None
+    return pid if uid == os.getuid() else None
+
+
+# --- server ---------------------------------------------------------------
+
+def serve_connection(conn: Connection, encode_slots: threading.Semaphore) -> None:
+    from app.services.model_registry import get_embedding_model
+
+    shm = None
+    try:
+        _, shm_name = conn.recv()
+        shm = shared_memory.SharedMemory(name=shm_name)
+        # The client owns the block; stop this process's tracker from unlinking it on exit
+        resource_tracker.unregister(shm._name, "shared_memory")
+
+        while True:
+            request_id, model_name, texts = conn.recv()
+            try:
+                with encode_slots:
+                    vectors = np.asarray(get_embedding_model(model_name).encode(texts, batch_size=len(texts)), dtype=np.float32)
+            except Exception as e:
+                conn.send((request_id, "error", str(e)))
+                continue
+
+            if vectors.nbytes <= shm.size:
+                np.ndarray(vectors.shape, dtype=np.float32, buffer=shm.buf)[:] = vectors
+                conn.send((request_id, "shm", vectors.shape))
+            else:
+                conn.send((request_id, "inline", vectors))
+    except (EOFError, OSError):
+        pass
+    finally:
+        if shm is not None:
+            shm.close()
+        conn.close()
+
+
+def serve(address: str) -> None:
+    _private_dir(address)
+    if os.path.exists(address):
+        os.unlink(address)
+    encode_slots = threading.Semaphore(service_settings.EMBEDDING_THREADS)
+    with Listener(address, family="AF_UNIX", authkey=_authkey()) as listener:
+        logging.info(f"Embedding worker {os.getpid()} listening on {address}")
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception as e:
+                logging.warning(f"Embedding worker rejected a connection: {e}")
+                continue
+            threading.Thread(target=serve_connection, args=(conn, encode_slots), daemon=True).start()
+
+
+# --- client ---------------------------------------------------------------
+
+class WorkerConnection:
+    """One socket to the worker plus the shared memory block its results land in."""
+
+    def __init__(self, address: str, shm_bytes: int):
+        self.conn = Client(address, family="AF_UNIX", authkey=_authkey())
+        self.server_pid = _peer_pid(self.conn)
+        self.shm = shared_memory.SharedMemory(create=True, size=shm_bytes)
+        self.conn.send(("hello", self.shm.name))
+        self.broken = False
+
+    def roundtrip(self, request_id: int, model_name: str, texts: List[str], timeout: float) -> List[List[float]]:
+        self.conn.send((request_id, model_name, texts))
+        # Polled instead of a bare recv so a hung worker releases this pool thread at the deadline
+        if not self.conn.poll(timeout):
+            raise WorkerTimeoutError(f"Embedding worker timed out after {timeout}s")
+        reply_id, kind, payload = self.conn.recv()
+        if reply_id != request_id:
+            raise WorkerUnavailableError(f"Embedding worker answered request {reply_id}, expected {request_id}")
+        if kind == "error":
+            raise RuntimeError(payload)
+        if kind == "inline":
+            return payload.tolist()
+        rows, dim = payload
+        return np.ndarray((rows, dim), dtype=np.float32, buffer=self.shm.buf).tolist()
+
+    def close(self) -> None:
+        self.broken = True
+        try:
+            self.conn.close()
+        except OSError:
+            pass
+        self.shm.close()
+        self.shm.unlink()
+
+
+class EmbeddingWorkerClient:
+    """Per API process: a few connections to the host worker, each with one request in flight."""
+
+    def __init__(
+        self,
+        address: str = service_settings.EMBEDDING_WORKER_SOCKET,
+        connections: int = service_settings.EMBEDDING_WORKER_CONNECTIONS,
+        timeout: float = service_settings.EMBEDDING_WORKER_TIMEOUT_SECONDS,
+        shm_bytes: int = service_settings.EMBEDDING_WORKER_SHM_MB * 1024 * 1024,
+        max_timeouts: int = service_settings.EMBEDDING_WORKER_MAX_TIMEOUTS,
+    ):
+        self.address = address
+        self.max_timeouts = max_timeouts
+        self.consecutive_timeouts = 0
+        self.connections = connections
+        self.timeout = timeout
+        self.shm_bytes = shm_bytes
+        self._idle: Optional[asyncio.Queue] = None
+        self._ids = itertools.count()
+        self.requests = 0
+        self.timeouts = 0
+        self.failures = 0
+        self.server_starts = 0
+        self.server_kills = 0
+
+    def _pool(self) -> asyncio.Queue:
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+            for _ in range(self.connections):
+                self._idle.put_nowait(None)  # opened on first use
+        return self._idle
+
+    def _connect(self) -> WorkerConnection:
+        _private_dir(self.address)
+        try:
+            return WorkerConnection(self.address, self.shm_bytes)
+        except (FileNotFoundError, ConnectionRefusedError):
+            pass
+
+        # Only one API worker on the host starts the server; the others wait for its socket
+        with open(f"{self.address}.lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                return WorkerConnection(self.address, self.shm_bytes)
+            except (FileNotFoundError, ConnectionRefusedError):
+                pass
+
+            subprocess.Popen(
+                [sys.executable, "-m", "app.services.embedding_worker"],
+                cwd=BACKEND_ROOT,
+                start_new_session=True,
+            )
+            self.server_starts += 1
+            logging.warning(f"Started embedding worker on {self.address}")
+
+            deadline = time.monotonic() + service_settings.EMBEDDING_WORKER_START_SECONDS
+            while time.monotonic() < deadline:
+                time.sleep(0.1)
+                try:
+                    return WorkerConnection(self.address, self.shm_bytes)
+                except (FileNotFoundError, ConnectionRefusedError):
+                    continue
+        raise WorkerUnavailableError(f"Embedding worker did not come up on {self.address}")
+
+    async def encode(self, model_name: str, texts: List[str]) -> List[List[float]]:
+        idle = self._pool()
+        worker = await idle.get()
+        self.requests += 1
+        try:
+            # Encoding is idempotent, so a connection lost to a crashed worker is retried once
+            for attempt in range(2):
+                if worker is None or worker.broken:
+                    worker = await asyncio.to_thread(self._connect)
+                try:
+                    result = await run_in_pool("embedding", worker.roundtrip, next(self._ids), model_name, texts, self.timeout)
+                    self.consecutive_timeouts = 0
+                    return result
+                except (EOFError, OSError) as e:
+                    self.failures += 1
+                    worker.close()
+                    if attempt:
+                        raise WorkerUnavailableError(f"Embedding worker connection lost: {e}")
+        except WorkerTimeoutError:
+            # roundtrip has returned, so nothing reads the shared block any more; the late
+            # reply would land in this connection's buffer, so the connection is dropped
+            self.timeouts += 1
+            self.consecutive_timeouts += 1
+            worker.close()
+            if self.consecutive_timeouts >= self.max_timeouts:
+                self._kill_server(worker.server_pid)
+            raise
+        finally:
+            idle.put_nowait(worker)
+
+    def _kill_server(self, pid: Optional[int]) -> None:
+        # A hung server keeps its socket, so connecting never fails and _connect would not replace it
+        self.consecutive_timeouts = 0
+        if pid is None:
+            logging.warning("Embedding worker keeps timing out but its pid is unknown; not restarting it")
+            return
+        logging.warning(f"Embedding worker {pid} timed out {self.max_timeouts} times in a row; killing it")
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        self.server_kills += 1
+
+    def close(self) -> None:
+        if self._idle is None:
+            return
+        while not self._idle.empty():
+            worker = self._idle.get_nowait()
+            if worker is not None and not worker.broken:
+                worker.close()
+        self._idle = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "socket": self.address,
+            "requests": self.requests,
+            "timeouts": self.timeouts,
+            "failures": self.failures,
+            "server_starts": self.server_starts,
+            "server_kills": self.server_kills,
+        }
+
+
+embedding_worker_client = EmbeddingWorkerClient()
+register_metrics("embedding_worker", embedding_worker_client.stats)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    serve(service_settings.EMBEDDING_WORKER_SOCKET)
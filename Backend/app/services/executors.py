@@ -0,0 +1,91 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from app.config.settings import service_settings
+from app.services.metrics import register_metrics
+
+
+class MeteredExecutor:
+    """Lazily created executor that tracks how much work is waiting on it."""
+
+    def __init__(self, name: str, factory: Callable[[], Executor], max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+        self._factory = factory
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+
+    @property
+    def executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._factory()
+            return self._executor
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        self.submitted += 1
+        try:
+            return await loop.run_in_executor(self.executor, fn, *args)
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.completed += 1
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        in_flight = self.submitted - self.completed
+        return {
+            "max_workers": self.max_workers,
+            "in_flight": in_flight,
+            "queue_depth": max(0, in_flight - self.max_workers),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+
+def _process_pool(max_workers: int) -> Callable[[], Executor]:
+    # spawn keeps the children free of the parent's model weights and threads
+    return lambda: ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def _thread_pool(name: str, max_workers: int) -> Callable[[], Executor]:
+    return lambda: ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+
+
+executors: Dict[str, MeteredExecutor] = {
+    "ocr": MeteredExecutor(
+        "ocr", _process_pool(service_settings.OCR_PROCESSES), service_settings.OCR_PROCESSES
+    ),
+    "embedding": MeteredExecutor(
+        "embedding", _thread_pool("embedding", service_settings.EMBEDDING_THREADS), service_settings.EMBEDDING_THREADS
+    ),
+    "password": MeteredExecutor(
+        "password", _thread_pool("password", service_settings.PASSWORD_HASH_THREADS), service_settings.PASSWORD_HASH_THREADS
+    ),
+}
+
+
+async def run_in_pool(name: str, fn: Callable[..., Any], *args: Any) -> Any:
+    return await executors[name].run(fn, *args)
+
+
+def shutdown_executors() -> None:
+    for executor in executors.values():
+        executor.shutdown()
+
+
+register_metrics("executors", lambda: {name: ex.stats() for name, ex in executors.items()})
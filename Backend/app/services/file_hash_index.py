@@ -0,0 +1,41 @@
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from app.config.database import get_db
+
+
+class FileHashIndex:
+    """Maps SHA256 of uploaded file bytes to the document_id it produced.
+
+    Recent hashes are answered from memory; misses fall through to the indexed
+    certificates.file_sha256 column.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def remember(self, file_hash: str, document_id: str) -> None:
+        with self._lock:
+            self._entries[file_hash] = document_id
+            self._entries.move_to_end(file_hash)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def lookup(self, file_hash: str) -> Optional[str]:
+        with self._lock:
+            document_id = self._entries.get(file_hash)
+            if document_id is not None:
+                self._entries.move_to_end(file_hash)
+                return document_id
+
+        db = get_db()
+        result = db.table("certificates").select("document_id").eq("file_sha256", file_hash).limit(1).execute()
+        if not result.data:
+            return None
+
+        document_id = result.data[0]["document_id"]
+        self.remember(file_hash, document_id)
+        return document_id
@@ -0,0 +1,181 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import HTTPException
+
+from app.config.settings import service_settings
+
+# Handler signature: (content, filename, student_id, on_stage) -> result dict
+IngestHandler = Callable[[bytes, str, str, Callable[[str], None]], Awaitable[Dict[str, Any]]]
+
+
+class LocalQueueBackend:
+    """In-process job store and FIFO queue. Jobs live for the lifetime of the worker process."""
+
+    def __init__(self, max_pending: int):
+        self._queue: Optional[asyncio.Queue] = None
+        self._max_pending = max_pending
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def queue(self) -> asyncio.Queue:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self._max_pending)
+        return self._queue
+
+    def create(self, job: Dict[str, Any]) -> None:
+        with self._lock:
+            self._jobs[job["job_id"]] = job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(fields)
+                job["updated_at"] = time.time()
+
+    def prune(self, ttl_seconds: int) -> None:
+        cutoff = time.time() - ttl_seconds
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job["status"] in ("done", "failed") and job["updated_at"] < cutoff
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+
+class IngestionQueue:
+    def __init__(
+        self,
+        handler: IngestHandler,
+        workers: int = service_settings.INGEST_WORKERS,
+        spool_dir: str = service_settings.INGEST_SPOOL_DIR,
+        backend: Optional[LocalQueueBackend] = None,
+    ):
+        self.handler = handler
+        self.workers = workers
+        self.spool_dir = Path(spool_dir)
+        self.backend = backend or LocalQueueBackend(service_settings.INGEST_MAX_PENDING)
+        self._tasks = []
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        for i in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(i)))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, content: bytes, filename: str, student_id: str) -> Dict[str, Any]:
+        self.backend.prune(service_settings.INGEST_JOB_TTL_SECONDS)
+        if self.backend.queue.full():
+            raise HTTPException(status_code=503, detail="Ingestion queue is full, please retry later")
+
+        job_id = uuid.uuid4().hex
+        spool_path = self.spool_dir / f"{job_id}{os.path.splitext(filename)[1]}"
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        # Uploads can be large, so the spool write stays off the event loop
+        await asyncio.to_thread(spool_path.write_bytes, content)
+        if self.backend.queue.full():
+            # Other uploads filled the queue while this one was being written
+            spool_path.unlink(missing_ok=True)
+            raise HTTPException(status_code=503, detail="Ingestion queue is full, please retry later")
+
+        now = time.time()
+        job = {
+            "job_id": job_id,
+            "student_id": student_id,
+            "filename": filename,
+            "spool_path": str(spool_path),
+            "status": "queued",
+            "stage": "queued",
+            "result": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        self.backend.create(job)
+        self.backend.queue.put_nowait(job_id)
+        return public_job(job)
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self.backend.get(job_id)
+        return public_job(job) if job else None
+
+    def owner(self, job_id: str) -> Optional[str]:
+        job = self.backend.get(job_id)
+        return job["student_id"] if job else None
+
+    async def _worker(self, worker_id: int) -> None:
+        while True:
+            job_id = await self.backend.queue.get()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Ingestion worker {worker_id} crashed on job {job_id}: {e}")
+            finally:
+                self.backend.queue.task_done()
+
+    async def _run(self, job_id: str) -> None:
+        job = self.backend.get(job_id)
+        if job is None:
+            return
+
+        spool_path = Path(job["spool_path"])
+        self.backend.update(job_id, status="running")
+
+        def on_stage(stage: str) -> None:
+            self.backend.update(job_id, stage=stage)
+
+        try:
+            content = await asyncio.to_thread(spool_path.read_bytes)
+            result = await self.handler(content, job["filename"], job["student_id"], on_stage)
+            self.backend.update(job_id, status="done", stage="done", result=result)
+        except HTTPException as e:
+            self.backend.update(
+                job_id,
+                status="failed",
+                result=getattr(e, "result", None),
+                error=str(e.detail),
+                error_code=e.status_code
+            )
+        except Exception as e:
+            logging.error(f"Ingestion job {job_id} failed: {e}")
+            self.backend.update(job_id, status="failed", error=str(e), error_code=500)
+        finally:
+            spool_path.unlink(missing_ok=True)
+
+
+def public_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "job_id": job["job_id"],
+        "filename": job["filename"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "result": job.get("result"),
+        "error": job.get("error"),
+        "error_code": job.get("error_code"),
+    }
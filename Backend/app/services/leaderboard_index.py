@@ -0,0 +1,189 @@
+import bisect
+import itertools
+import threading
+import time
+from datetime import date
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.services.metrics import register_metrics
+
+PARTITION_FIELDS = ("fakultas", "prodi", "angkatan")
+
+Partition = Tuple[Tuple[str, str], ...]
+RankKey = Tuple[float, str]
+
+
+def partition_key(filters: Dict[str, Any]) -> Partition:
+    """Canonical key for a set of filters, e.g. {"prodi": "IF", "angkatan": 2022} -> (("prodi", "IF"), ("angkatan", "2022"))"""
+    return tuple((field, str(filters[field])) for field in PARTITION_FIELDS if filters.get(field) not in (None, ""))
+
+
+def student_partitions(row: Dict[str, Any]) -> List[Partition]:
+    # Every combination of the student's own fakultas/prodi/angkatan, the empty one being the global board
+    fields = [field for field in PARTITION_FIELDS if row.get(field) not in (None, "")]
+    return [
+        partition_key({field: row[field] for field in combo})
+        for size in range(len(fields) + 1)
+        for combo in itertools.combinations(fields, size)
+    ]
+
+
+def rank_key(row: Dict[str, Any]) -> RankKey:
+    return (-float(row["weighted_score"]), row["student_id"])
+
+
+class LeaderboardIndex:
+    """Aggregate rows of every ranked student, ordered globally and within each partition.
+
+    A partition is any combination of fakultas, prodi and angkatan. Each one
+    keeps its students sorted by weighted score, so a top-K page is a slice
+    of its first K keys and a write re-positions one student with a bisect
+    per partition it belongs to. Rankings are kept whole rather than cut at
+    K so a student dropping out of the top promotes the next one without a
+    rescan.
+    """
+
+    def __init__(self):
+        self.students: Dict[str, Dict[str, Any]] = {}
+        self.rankings: Dict[Partition, List[RankKey]] = {}
+        self.ready = False
+        self.loaded_at = 0.0
+        self._lock = threading.RLock()
+
+    def rebuild(self, rows: List[Dict[str, Any]]) -> None:
+        """Rank every partition in one pass over the aggregate rows"""
+        students = {row["student_id"]: row for row in rows}
+        rankings: Dict[Partition, List[RankKey]] = {}
+        for row in students.values():
+            key = rank_key(row)
+            for partition in student_partitions(row):
+                rankings.setdefault(partition, []).append(key)
+        for ranking in rankings.values():
+            ranking.sort()
+
+        with self._lock:
+            self.students = students
+            self.rankings = rankings
+            self.ready = True
+            self.loaded_at = time.monotonic()
+
+    def upsert(self, row: Dict[str, Any]) -> None:
+        with self._lock:
+            self.remove(row["student_id"])
+            self.students[row["student_id"]] = row
+            key = rank_key(row)
+            for partition in student_partitions(row):
+                bisect.insort(self.rankings.setdefault(partition, []), key)
+
+    def remove(self, student_id: str) -> None:
+        with self._lock:
+            row = self.students.pop(student_id, None)
+            if row is None:
+                return
+            key = rank_key(row)
+            for partition in student_partitions(row):
+                ranking = self.rankings.get(partition)
+                if not ranking:
+                    continue
+                i = bisect.bisect_left(ranking, key)
+                if i < len(ranking) and ranking[i] == key:
+                    del ranking[i]
+                if not ranking:
+                    del self.rankings[partition]
+
+    def top(self, limit: int, filters: Optional[Dict[str, Any]] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """First `limit` aggregate rows of a partition and how many students it ranks"""
+        with self._lock:
+            ranking = self.rankings.get(partition_key(filters or {}), [])
+            return [self.students[student_id] for _, student_id in ranking[:limit]], len(ranking)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "students": len(self.students),
+            "partitions": len(self.rankings),
+            "age_seconds": round(time.monotonic() - self.loaded_at, 1) if self.ready else None,
+        }
+
+
+class DailyBuckets:
+    """Each student's SPU sum and certificate count per day.
+
+    A date window is answered by merging the buckets of the days inside it
+    (found by bisecting the sorted day list), never by re-reading
+    certificates. A write replaces one student's buckets.
+    """
+
+    def __init__(self):
+        self.days: Dict[date, Dict[str, Tuple[float, int]]] = {}
+        self.ordered: List[date] = []
+        self.student_days: Dict[str, Set[date]] = {}
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _day(value: Any) -> date:
+        return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+
+    def rebuild(self, rows: List[Dict[str, Any]]) -> None:
+        days: Dict[date, Dict[str, Tuple[float, int]]] = {}
+        student_days: Dict[str, Set[date]] = {}
+        for row in rows:
+            day = self._day(row["day"])
+            days.setdefault(day, {})[row["student_id"]] = (float(row["total_spu"]), int(row["certificate_count"]))
+            student_days.setdefault(row["student_id"], set()).add(day)
+
+        with self._lock:
+            self.days = days
+            self.ordered = sorted(days)
+            self.student_days = student_days
+
+    def replace_student(self, student_id: str, rows: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            for day in self.student_days.pop(student_id, ()):
+                bucket = self.days[day]
+                bucket.pop(student_id, None)
+                if not bucket:
+                    del self.days[day]
+                    del self.ordered[bisect.bisect_left(self.ordered, day)]
+
+            for row in rows:
+                day = self._day(row["day"])
+                if day not in self.days:
+                    self.days[day] = {}
+                    bisect.insort(self.ordered, day)
+                self.days[day][student_id] = (float(row["total_spu"]), int(row["certificate_count"]))
+                self.student_days.setdefault(student_id, set()).add(day)
+
+    def window(self, start: date, end: date) -> Dict[str, List[Any]]:
+        """student_id -> [total_spu, certificate_count, last day] over start..end inclusive"""
+        merged: Dict[str, List[Any]] = {}
+        with self._lock:
+            first = bisect.bisect_left(self.ordered, start)
+            last = bisect.bisect_right(self.ordered, end)
+            for day in self.ordered[first:last]:
+                for student_id, (total_spu, count) in self.days[day].items():
+                    entry = merged.get(student_id)
+                    if entry is None:
+                        merged[student_id] = [total_spu, count, day]
+                    else:
+                        entry[0] += total_spu
+                        entry[1] += count
+                        entry[2] = day
+        return merged
+
+    def last_day(self, student_id: str) -> Optional[date]:
+        days = self.student_days.get(student_id)
+        return max(days) if days else None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "days": len(self.ordered),
+            "buckets": sum(len(bucket) for bucket in self.days.values()),
+            "first_day": self.ordered[0].isoformat() if self.ordered else None,
+        }
+
+
+leaderboard_index = LeaderboardIndex()
+daily_buckets = DailyBuckets()
+register_metrics("leaderboard_index", leaderboard_index.stats)
+register_metrics("leaderboard_daily", daily_buckets.stats)
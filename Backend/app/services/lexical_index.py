@@ -0,0 +1,96 @@
+import bisect
+import math
+import re
+from collections import Counter
+from typing import Dict, List
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """Token-level inverted index with Okapi BM25 scoring.
+
+    Every query token also matches the indexed terms it is a prefix of
+    ("robot" finds "robotik"); those expansions are found by bisecting a
+    sorted vocabulary and score at prefix_weight of an exact hit.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, prefix_weight: float = 0.5, max_expansions: int = 50):
+        self.k1 = k1
+        self.b = b
+        self.prefix_weight = prefix_weight
+        self.max_expansions = max_expansions
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.doc_terms: Dict[str, Counter] = {}
+        self.doc_lengths: Dict[str, int] = {}
+        self.total_length = 0
+        self.vocabulary: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def add(self, doc_id: str, text: str) -> None:
+        self.remove(doc_id)
+        terms = Counter(tokenize(text))
+        if not terms:
+            return
+
+        for term, tf in terms.items():
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = self.postings[term] = {}
+                bisect.insort(self.vocabulary, term)
+            posting[doc_id] = tf
+        self.doc_terms[doc_id] = terms
+        length = sum(terms.values())
+        self.doc_lengths[doc_id] = length
+        self.total_length += length
+
+    def remove(self, doc_id: str) -> None:
+        terms = self.doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            posting = self.postings[term]
+            del posting[doc_id]
+            if not posting:
+                del self.postings[term]
+                del self.vocabulary[bisect.bisect_left(self.vocabulary, term)]
+        self.total_length -= self.doc_lengths.pop(doc_id)
+
+    def expand(self, token: str) -> List[str]:
+        """Indexed terms starting with token, the exact term first when present"""
+        start = bisect.bisect_left(self.vocabulary, token)
+        end = bisect.bisect_left(self.vocabulary, token + "\uffff", start)
+        return self.vocabulary[start:min(end, start + self.max_expansions)]
+
+    def search(self, query: str) -> Dict[str, float]:
+        """BM25 score of every document matching at least one query token"""
+        doc_count = len(self.doc_lengths)
+        if not doc_count:
+            return {}
+        avg_length = self.total_length / doc_count
+
+        scores: Dict[str, float] = {}
+        for token in dict.fromkeys(tokenize(query)):
+            # A document counts each query token once, through its best-scoring expansion
+            best: Dict[str, float] = {}
+            for term in self.expand(token):
+                posting = self.postings[term]
+                idf = math.log(1 + (doc_count - len(posting) + 0.5) / (len(posting) + 0.5))
+                weight = idf if term == token else idf * self.prefix_weight
+                for doc_id, tf in posting.items():
+                    norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / avg_length)
+                    score = weight * tf * (self.k1 + 1) / (tf + norm)
+                    if score > best.get(doc_id, 0.0):
+                        best[doc_id] = score
+            for doc_id, score in best.items():
+                scores[doc_id] = scores.get(doc_id, 0.0) + score
+        return scores
+
+    def stats(self) -> Dict[str, int]:
+        return {"documents": len(self.doc_lengths), "terms": len(self.vocabulary)}
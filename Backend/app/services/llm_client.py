@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import groq
+from groq import AsyncGroq
+
+from app.config.settings import service_settings
+
+RETRYABLE_ERRORS = (
+    asyncio.TimeoutError,
+    groq.APIConnectionError,
+    groq.RateLimitError,
+    groq.InternalServerError,
+)
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures and lets a single probe through once reset_seconds pass."""
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.state = "half_open"
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    logging.warning(f"LLM circuit opened after {self.failures} failures")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def abandon_probe(self) -> None:
+        # A cancelled probe proves nothing; let the next caller probe straight away
+        with self._lock:
+            if self.state == "half_open":
+                self.state = "open"
+                self.opened_at = time.monotonic() - self.reset_seconds
+
+    def stats(self) -> Dict[str, Any]:
+        return {"state": self.state, "consecutive_failures": self.failures, "rejected": self.rejected}
+
+
+class AsyncLLMClient:
+    def __init__(
+        self,
+        api_key: str,
+        base_url: Optional[str] = service_settings.GROQ_BASE_URL,
+        max_concurrency: int = service_settings.LLM_MAX_CONCURRENCY,
+        timeout: float = service_settings.LLM_TIMEOUT_SECONDS,
+        max_retries: int = service_settings.LLM_MAX_RETRIES,
+        backoff_seconds: float = service_settings.LLM_BACKOFF_SECONDS,
+        deadline: float = service_settings.LLM_DEADLINE_SECONDS,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        # Retries are handled here so they share the breaker and the jitter policy
+        self.client = AsyncGroq(api_key=api_key, base_url=base_url, timeout=timeout, max_retries=0)
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.deadline = deadline
+        self.breaker = breaker or CircuitBreaker(
+            service_settings.LLM_BREAKER_FAILURES,
+            service_settings.LLM_BREAKER_RESET_SECONDS
+        )
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def complete(self, prompt: str, model: str, temperature: float = 0.0, max_tokens: int = 1200) -> str:
+        if not self.breaker.allow():
+            raise CircuitOpenError("LLM circuit is open")
+
+        try:
+            async with self.semaphore:
+                return await self._complete_with_retries(prompt, model, temperature, max_tokens)
+        except asyncio.CancelledError:
+            self.breaker.abandon_probe()
+            raise
+
+    async def _complete_with_retries(self, prompt: str, model: str, temperature: float, max_tokens: int) -> str:
+        # Attempts and backoff share one budget, so a slow upstream cannot hold a request for timeout x attempts
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            self.calls += 1
+            try:
+                response = await asyncio.wait_for(
+                    self.client.chat.completions.create(
+                        messages=[{"role": "user", "content": prompt}],
+                        model=model,
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                    ),
+                    timeout=min(self.timeout, max(0.0, deadline - time.monotonic()))
+                )
+                self.breaker.record_success()
+                return response.choices[0].message.content
+            except RETRYABLE_ERRORS as e:
+                delay = self.backoff_seconds * (2 ** attempt) * random.uniform(0.5, 1.5)
+                if attempt >= self.max_retries or time.monotonic() + delay >= deadline:
+                    self.failures += 1
+                    self.breaker.record_failure()
+                    raise
+                attempt += 1
+                self.retries += 1
+                logging.info(f"LLM call failed ({e.__class__.__name__}), retry {attempt} in {delay:.2f}s")
+            except groq.APIStatusError:
+                # Any other status (400, 401, 404, ...) is a bad request, not an unhealthy service
+                self.failures += 1
+                self.breaker.record_success()
+                raise
+            except Exception:
+                self.failures += 1
+                self.breaker.abandon_probe()
+                raise
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "max_concurrency": self.max_concurrency,
+            "breaker": self.breaker.stats(),
+        }
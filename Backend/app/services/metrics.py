@@ -0,0 +1,48 @@
+import bisect
+import logging
+import threading
+from typing import Any, Callable, Dict, List
+
+_providers: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+
+def register_metrics(name: str, provider: Callable[[], Dict[str, Any]]) -> None:
+    _providers[name] = provider
+
+
+def metrics_snapshot() -> Dict[str, Any]:
+    snapshot = {}
+    for name, provider in _providers.items():
+        try:
+            snapshot[name] = provider()
+        except Exception as e:
+            logging.warning(f"Could not collect metrics for {name}: {e}")
+            snapshot[name] = {"error": str(e)}
+    return snapshot
+
+
+class Histogram:
+    """Fixed-bucket histogram; each bucket counts values above the previous bound up to its own."""
+
+    def __init__(self, buckets: List[float]):
+        self.buckets = sorted(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.samples = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.total += value
+            self.samples += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            buckets = {f"le_{bound:g}": count for bound, count in zip(self.buckets, self.counts)}
+            buckets["le_inf"] = self.counts[-1]
+            return {
+                "count": self.samples,
+                "mean": round(self.total / self.samples, 4) if self.samples else 0.0,
+                "buckets": buckets,
+            }
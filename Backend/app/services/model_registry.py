@@ -0,0 +1,127 @@
+import logging
+import os
+import resource
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable
+
+from app.config.settings import service_settings
+from app.services.metrics import register_metrics
+
+
+def current_rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss is the peak, in KiB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def load_sentence_transformer(name: str) -> Any:
+    # Imported here so booting the API does not pull in torch
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(name)
+
+
+def load_onnx_encoder(name: str) -> Any:
+    from app.services.onnx_embedder import POOLING_CONFIG, OnnxSentenceEncoder, onnx_model_dir
+    model_dir = onnx_model_dir(service_settings.ONNX_MODEL_DIR, name)
+    if not os.path.exists(os.path.join(model_dir, POOLING_CONFIG)):
+        raise FileNotFoundError(
+            f"No ONNX export of {name} in {model_dir}; run python -m scripts.export_onnx_model --model {name}"
+        )
+    return OnnxSentenceEncoder(model_dir, intra_op_threads=service_settings.ONNX_INTRA_OP_THREADS)
+
+
+EMBEDDING_BACKENDS: Dict[str, Callable[[str], Any]] = {
+    "torch": load_sentence_transformer,
+    "onnx": load_onnx_encoder,
+}
+
+
+def load_embedding_model(name: str) -> Any:
+    try:
+        loader = EMBEDDING_BACKENDS[service_settings.EMBEDDING_BACKEND]
+    except KeyError:
+        raise ValueError(f"Unknown EMBEDDING_BACKEND {service_settings.EMBEDDING_BACKEND}")
+    return loader(name)
+
+
+class ModelRegistry:
+    """Loads each model at most once per process, on first use."""
+
+    def __init__(self, loader: Callable[[str], Any] = load_embedding_model):
+        self.loader = loader
+        self._models: Dict[str, Any] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._registry_lock = threading.Lock()
+        self.warmed_up = False
+        # Models whose warmup load failed, with the error; /ready stays 503 while any remain
+        self.warmup_errors: Dict[str, str] = {}
+
+    def _lock_for(self, name: str) -> threading.Lock:
+        with self._registry_lock:
+            return self._locks.setdefault(name, threading.Lock())
+
+    def get(self, name: str) -> Any:
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        with self._lock_for(name):
+            model = self._models.get(name)
+            if model is not None:
+                return model
+
+            rss_before = current_rss_mb()
+            started = time.perf_counter()
+            try:
+                model = self.loader(name)
+            except Exception as e:
+                self._stats[name] = {"loaded": False, "error": str(e)}
+                raise
+
+            self._stats[name] = {
+                "loaded": True,
+                "load_seconds": round(time.perf_counter() - started, 2),
+                "rss_delta_mb": round(current_rss_mb() - rss_before, 1),
+                "loaded_at": time.time(),
+            }
+            logging.info(f"Loaded model {name} in {self._stats[name]['load_seconds']}s")
+            self._models[name] = model
+            # A later successful load (e.g. on first use) clears a failed warmup
+            if self.warmup_errors.pop(name, None) is not None and not self.warmup_errors:
+                self.warmed_up = True
+            return model
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    def warmup(self, names: Iterable[str]) -> None:
+        for name in dict.fromkeys(names):
+            try:
+                self.get(name)
+            except Exception as e:
+                logging.warning(f"Could not warm up model {name}: {e}")
+                self.warmup_errors[name] = str(e)
+        self.warmed_up = not self.warmup_errors
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": service_settings.EMBEDDING_BACKEND,
+            "warmed_up": self.warmed_up,
+            "warmup_errors": dict(self.warmup_errors),
+            "rss_mb": round(current_rss_mb(), 1),
+            "models": dict(self._stats),
+        }
+
+
+model_registry = ModelRegistry()
+register_metrics("models", model_registry.stats)
+
+
+def get_embedding_model(name: str) -> Any:
+    return model_registry.get(name)
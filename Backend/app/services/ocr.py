@@ -0,0 +1,128 @@
+import asyncio
+import io
+import logging
+import math
+import re
+import time
+from typing import Dict, Tuple
+
+import pytesseract
+from fastapi import HTTPException
+from PIL import Image
+from pdf2image import convert_from_bytes, pdfinfo_from_bytes
+
+from app.config.settings import service_settings
+from app.services.executors import run_in_pool
+
+PAGE_SIZE_PATTERN = re.compile(r"([\d.]+)\s*x\s*([\d.]+)")
+PAGE_KEY_PATTERN = re.compile(r"Page\s+(\d+)\s+size")
+
+
+def page_memory_budget() -> int:
+    return service_settings.OCR_PAGE_MEMORY_MB * 1024 * 1024
+
+
+def bytes_per_pixel() -> int:
+    return 1 if service_settings.OCR_GRAYSCALE else 3
+
+
+def page_dpi(width_pts: float, height_pts: float) -> int:
+    """Highest DPI up to OCR_DPI whose raster still fits in the per-page memory ceiling"""
+    square_inches = (width_pts / 72) * (height_pts / 72)
+    if square_inches <= 0:
+        return service_settings.OCR_DPI
+
+    max_dpi = int(math.sqrt(page_memory_budget() / (square_inches * bytes_per_pixel())))
+    if max_dpi < service_settings.OCR_MIN_DPI:
+        raise HTTPException(status_code=422, detail="Certificate page is too large to read")
+    return min(service_settings.OCR_DPI, max_dpi)
+
+
+def pdf_page_sizes(content: bytes, page_count: int) -> Dict[int, Tuple[float, float]]:
+    info = pdfinfo_from_bytes(content, first_page=1, last_page=page_count)
+    sizes = {}
+    for key, value in info.items():
+        page_match = PAGE_KEY_PATTERN.match(str(key))
+        size_match = PAGE_SIZE_PATTERN.search(str(value))
+        if page_match and size_match:
+            sizes[int(page_match.group(1))] = (float(size_match.group(1)), float(size_match.group(2)))
+    return sizes
+
+
+def seconds_left(deadline: float) -> float:
+    """Time a worker may still spend before the document deadline (wall clock, shared with the parent)"""
+    remaining = deadline - time.time()
+    if remaining <= 0:
+        raise TimeoutError("OCR deadline passed")
+    return remaining
+
+
+def ocr_pdf_page(content: bytes, page_number: int, dpi: int, grayscale: bool, lang: str, deadline: float) -> str:
+    # Only this page is ever decoded, so a worker holds at most one raster at a time.
+    # pdftoppm and tesseract are killed at the deadline, so an abandoned document frees the worker
+    images = convert_from_bytes(
+        content,
+        dpi=dpi,
+        first_page=page_number,
+        last_page=page_number,
+        grayscale=grayscale,
+        thread_count=1,
+        timeout=seconds_left(deadline),
+    )
+    text = ""
+    for img in images:
+        text += pytesseract.image_to_string(img, lang=lang, timeout=seconds_left(deadline))
+        img.close()
+    return text
+
+
+def ocr_image(content: bytes, max_pixels: int, grayscale: bool, lang: str, deadline: float) -> str:
+    image = Image.open(io.BytesIO(content))
+    width, height = image.size
+    if width * height > max_pixels:
+        # thumbnail() uses the JPEG draft mode, so oversized photos are decoded at reduced scale
+        scale = math.sqrt(max_pixels / (width * height))
+        image.thumbnail((max(1, int(width * scale)), max(1, int(height * scale))))
+    if grayscale:
+        image = image.convert("L")
+    return pytesseract.image_to_string(image, lang=lang, timeout=seconds_left(deadline))
+
+
+async def ocr_document(content: bytes, filename: str, lang: str) -> str:
+    """OCR a PDF page-by-page in parallel, or a single image, within the document deadline"""
+    grayscale = service_settings.OCR_GRAYSCALE
+    deadline = time.time() + service_settings.OCR_DEADLINE_SECONDS
+
+    if not filename.lower().endswith('.pdf'):
+        max_pixels = page_memory_budget() // bytes_per_pixel()
+        jobs = [run_in_pool("ocr", ocr_image, content, max_pixels, grayscale, lang, deadline)]
+    else:
+        info = await asyncio.to_thread(pdfinfo_from_bytes, content)
+        page_count = int(info.get("Pages", 1))
+        if page_count > service_settings.OCR_MAX_PAGES:
+            logging.warning(
+                f"{filename} has {page_count} pages, only the first "
+                f"{service_settings.OCR_MAX_PAGES} will be read"
+            )
+            page_count = service_settings.OCR_MAX_PAGES
+
+        sizes = await asyncio.to_thread(pdf_page_sizes, content, page_count)
+        dpis = [page_dpi(*sizes.get(page_number, (0.0, 0.0))) for page_number in range(1, page_count + 1)]
+        jobs = [
+            run_in_pool("ocr", ocr_pdf_page, content, page_number, dpi, grayscale, lang, deadline)
+            for page_number, dpi in enumerate(dpis, start=1)
+        ]
+
+    try:
+        # gather keeps page order regardless of completion order
+        pages = await asyncio.wait_for(
+            asyncio.gather(*jobs),
+            timeout=max(0.0, deadline - time.time())
+        )
+    except Exception as e:
+        # Workers kill pdftoppm/tesseract at the deadline, which can surface just before wait_for fires
+        if isinstance(e, asyncio.TimeoutError) or time.time() >= deadline:
+            raise HTTPException(status_code=422, detail="Certificate took too long to read, try a smaller file")
+        raise
+
+    return "".join(pages)
@@ -0,0 +1,71 @@
+import json
+import os
+import re
+from typing import Any, Dict, List
+
+import numpy as np
+
+POOLING_CONFIG = "aura_pooling.json"
+MODEL_FILE = "model_int8.onnx"
+FLOAT_MODEL_FILE = "model.onnx"
+
+
+def onnx_model_dir(base_dir: str, model_name: str) -> str:
+    return os.path.join(base_dir, re.sub(r"[^\w.-]+", "__", model_name))
+
+
+class OnnxSentenceEncoder:
+    """Sentence-transformers compatible encode() on an exported ONNX model.
+
+    The directory is written by scripts/export_onnx_model.py: the (int8)
+    ONNX graph, tokenizer.json and the pooling settings of the original
+    SentenceTransformer, so outputs match it without importing torch.
+    """
+
+    def __init__(self, model_dir: str, intra_op_threads: int = 0, quantized: bool = True):
+        # Imported here so the torch backend does not need onnxruntime installed
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(model_dir, POOLING_CONFIG)) as f:
+            self.config: Dict[str, Any] = json.load(f)
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(self.config["max_seq_length"])
+        self.tokenizer.enable_padding(pad_id=self.config["pad_token_id"], pad_token=self.config["pad_token"])
+
+        options = onnxruntime.SessionOptions()
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        model_file = MODEL_FILE if quantized else FLOAT_MODEL_FILE
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(model_dir, model_file),
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def _encode_chunk(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+
+        token_embeddings = self.session.run(None, feeds)[0]
+        if self.config["pooling"] == "cls":
+            pooled = token_embeddings[:, 0]
+        else:
+            mask = attention_mask[..., None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+        if self.config["normalize"]:
+            pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.astype(np.float32)
+
+    def encode(self, texts: List[str], batch_size: int = 32, **_: Any) -> np.ndarray:
+        if isinstance(texts, str):
+            return self._encode_chunk([texts])[0]
+        chunks = [self._encode_chunk(texts[i:i + batch_size]) for i in range(0, len(texts), batch_size)]
+        return np.concatenate(chunks) if chunks else np.zeros((0, 0), dtype=np.float32)
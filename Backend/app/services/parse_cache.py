@@ -0,0 +1,135 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from app.config.settings import service_settings
+from app.services.cache import TTLCache
+from app.services.metrics import register_metrics
+
+
+class ParseCache:
+    """Two-tier cache for LLM certificate parses.
+
+    The memory tier is an LRU with TTL; the SQLite tier survives restarts and
+    is shared by every worker on the host. Rows past the persistent TTL, and
+    the oldest rows beyond max_rows, are deleted when the database is opened
+    and again every prune_every writes.
+    """
+
+    def __init__(
+        self,
+        path: str = service_settings.PARSE_CACHE_PATH,
+        max_entries: int = service_settings.PARSE_CACHE_SIZE,
+        ttl_seconds: int = service_settings.PARSE_CACHE_TTL_SECONDS,
+        persist_ttl_seconds: int = service_settings.PARSE_CACHE_PERSIST_TTL_SECONDS,
+        max_rows: int = service_settings.PARSE_CACHE_MAX_ROWS,
+        prune_every: int = service_settings.PARSE_CACHE_PRUNE_EVERY,
+    ):
+        self.path = path
+        self.persist_ttl_seconds = persist_ttl_seconds
+        self.max_rows = max_rows
+        self.prune_every = prune_every
+        self.writes_since_prune = 0
+        self.pruned_rows = 0
+        self.memory = TTLCache(max_entries, ttl_seconds)
+        self.disk_hits = 0
+        self.disk_misses = 0
+        self.llm_calls = 0
+        self.llm_seconds = 0.0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @staticmethod
+    def make_key(text_hash: str, model: str, prompt_version: str) -> str:
+        return f"{model}:{prompt_version}:{text_hash}"
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS parse_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS parse_cache_created_at ON parse_cache (created_at)")
+            self._conn.commit()
+            self._prune(self._conn)
+        return self._conn
+
+    def _prune(self, conn: sqlite3.Connection) -> None:
+        # Caller holds self._lock
+        expired = conn.execute(
+            "DELETE FROM parse_cache WHERE created_at < ?", (time.time() - self.persist_ttl_seconds,)
+        ).rowcount
+        overflow = conn.execute(
+            "DELETE FROM parse_cache WHERE key IN ("
+            "SELECT key FROM parse_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_rows,)
+        ).rowcount
+        conn.commit()
+        self.pruned_rows += expired + overflow
+        self.writes_since_prune = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self.memory.get(key)
+        if value is not None:
+            return dict(value)
+
+        try:
+            with self._lock:
+                row = self._connection().execute(
+                    "SELECT value, created_at FROM parse_cache WHERE key = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logging.warning(f"Parse cache read failed: {e}")
+            return None
+
+        if row is None or row[1] < time.time() - self.persist_ttl_seconds:
+            self.disk_misses += 1
+            return None
+
+        self.disk_hits += 1
+        value = json.loads(row[0])
+        self.memory.set(key, value)
+        return dict(value)
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        self.memory.set(key, dict(value))
+        try:
+            with self._lock:
+                conn = self._connection()
+                conn.execute(
+                    "INSERT OR REPLACE INTO parse_cache (key, value, created_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value), time.time())
+                )
+                conn.commit()
+                self.writes_since_prune += 1
+                if self.writes_since_prune >= self.prune_every:
+                    self._prune(conn)
+        except sqlite3.Error as e:
+            logging.warning(f"Parse cache write failed: {e}")
+
+    def record_llm_call(self, seconds: float) -> None:
+        self.llm_calls += 1
+        self.llm_seconds += seconds
+
+    def stats(self) -> Dict[str, Any]:
+        memory = self.memory.stats()
+        hits = memory["hits"] + self.disk_hits
+        lookups = memory["hits"] + memory["misses"]
+        avg_llm_seconds = self.llm_seconds / self.llm_calls if self.llm_calls else 0.0
+        return {
+            "memory": memory,
+            "disk": {"hits": self.disk_hits, "misses": self.disk_misses, "pruned_rows": self.pruned_rows},
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "llm_calls": self.llm_calls,
+            "avg_llm_seconds": round(avg_llm_seconds, 3),
+            "estimated_llm_seconds_saved": round(hits * avg_llm_seconds, 1),
+        }
+
+
+parse_cache = ParseCache()
+register_metrics("parse_cache", parse_cache.stats)
@@ -0,0 +1,89 @@
+"""Cached JSON responses for read-heavy staff endpoints, keyed by certificate version.
+
+The responses are built from this process's leaderboard and search indexes,
+so the version is per process too: it is bumped by the certificate writes
+this worker handles and whenever it reloads an index from the database.
+Nothing is shared between workers. A write made through another worker is
+only seen here once a cached entry has expired (RESPONSE_CACHE_TTL_SECONDS)
+and the rebuild finds its index older than LEADERBOARD_RELOAD_SECONDS or
+SEARCH_INDEX_RELOAD_SECONDS and reloads it; until then this worker serves
+the stale page with a valid ETag. Responses carry an ETag of their body and
+a matching If-None-Match gets an empty 304.
+"""
+import hashlib
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.config.settings import service_settings
+from app.services.cache import TTLCache
+from app.services.metrics import register_metrics
+
+CachedResponse = Tuple[str, bytes, Dict[str, str]]
+
+
+class CertificateVersion:
+    """In-process counter bumped whenever this worker's view of the certificates changes."""
+
+    def __init__(self):
+        self.version = 0
+        self._lock = threading.Lock()
+
+    def current(self) -> int:
+        return self.version
+
+    def bump(self) -> int:
+        with self._lock:
+            self.version += 1
+            return self.version
+
+
+certificate_version = CertificateVersion()
+response_cache = TTLCache(service_settings.RESPONSE_CACHE_SIZE, service_settings.RESPONSE_CACHE_TTL_SECONDS)
+register_metrics("response_cache", lambda: {**response_cache.stats(), "certificate_version": certificate_version.current()})
+
+
+def bump_certificate_version() -> None:
+    """Call after any certificate write or index reload in this process"""
+    certificate_version.bump()
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in tags or etag in tags
+
+
+async def cached_json(
+    request: Request,
+    endpoint: str,
+    params: Dict[str, Any],
+    build: Callable[[], Awaitable[Tuple[Any, Optional[Dict[str, str]]]]],
+) -> Response:
+    """Serve `build()`'s (payload, headers) from the cache, computing it once per certificate version.
+
+    Only payloads with status_code 200 are cached, so errors are retried on
+    the next request.
+    """
+    version = certificate_version.current()
+    key: Hashable = (endpoint, tuple(sorted(params.items())), version)
+    entry: Optional[CachedResponse] = response_cache.get(key)
+
+    if entry is None:
+        payload, headers = await build()
+        body = JSONResponse(jsonable_encoder(payload)).body
+        etag = f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+        entry = (etag, body, headers or {})
+        if getattr(payload, "status_code", 200) == 200:
+            response_cache.set(key, entry)
+
+    etag, body, headers = entry
+    headers = {**headers, "ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
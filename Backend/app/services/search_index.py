@@ -0,0 +1,573 @@
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.config.database import get_db
+from app.config.settings import service_settings
+from app.services.background import spawn
+from app.services.ann_index import IVFFlatIndex
+from app.services.embedding_codec import decode_embedding
+from app.services.lexical_index import BM25Index
+from app.services.metrics import register_metrics
+from app.services.response_cache import bump_certificate_version
+
+SEARCHABLE_STATUSES = ["validated", "processed"]
+
+RECORD_SELECT = """
+    id,
+    student_id,
+    after_normalized,
+    parsed,
+    evidence_url,
+    status,
+    Users (
+        nama,
+        nim
+    )
+"""
+INDEX_SELECT = "embedding_q, " + RECORD_SELECT.strip()
+# Single-row reads also take the JSON column, for rows scripts/migrate_embeddings.py has not packed yet
+REFRESH_SELECT = "embedding, " + INDEX_SELECT
+LEGACY_EMBEDDING_COLUMN = "embedding"
+# With a saved IVF build only display fields are read, plus when each embedding last changed
+SAVED_BUILD_SELECT = "embedding_updated_at, " + RECORD_SELECT.strip()
+# Compared against the database clock, so rows changed this close to a build are re-read too
+SOURCE_CLOCK_SKEW_SECONDS = 300
+
+
+def normalize_query(query: np.ndarray, dim: Optional[int]) -> Optional[np.ndarray]:
+    query = np.asarray(query, dtype=np.float32).ravel()
+    if dim is None or query.shape[0] != dim:
+        return None
+    norm = np.linalg.norm(query)
+    return query / norm if norm else None
+
+
+def row_embedding(row: Dict[str, Any]) -> Optional[np.ndarray]:
+    """Packed embedding_q, falling back to the legacy JSON embedding when the row has one"""
+    vector = decode_embedding(row.get("embedding_q"))
+    if vector is None:
+        vector = decode_embedding(row.get(LEGACY_EMBEDDING_COLUMN))
+    return vector
+
+
+def changed_since(row: Dict[str, Any], source_at: float) -> bool:
+    value = row.get("embedding_updated_at")
+    if not value:
+        return True
+    try:
+        changed_at = datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return True
+    return changed_at >= source_at - SOURCE_CLOCK_SKEW_SECONDS
+
+
+def lexical_text(record: Dict[str, Any]) -> str:
+    return " ".join(str(record[f]) for f in ("event_name", "category_raw", "domain_raw") if record.get(f))
+
+
+def record_from_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """The fields search needs from a certificates row joined with Users"""
+    parsed = row.get("parsed") or {}
+    after_norm = row.get("after_normalized") or {}
+
+    student_name = "Unknown"
+    student_nim = "Unknown"
+    user_data = row.get("Users")
+    if isinstance(user_data, list) and user_data:
+        user_data = user_data[0]
+    if isinstance(user_data, dict):
+        student_name = user_data.get("nama", "Unknown")
+        student_nim = user_data.get("nim", "Unknown")
+
+    try:
+        spu_score = float(after_norm.get("spu_score", 0.0))
+    except (ValueError, TypeError):
+        spu_score = 0.0
+
+    return {
+        "id": row.get("id"),
+        "student_id": row.get("student_id"),
+        "student_name": student_name,
+        "student_nim": student_nim,
+        "event_name": parsed.get("event_name", "") or "",
+        "level_raw": parsed.get("level_raw", "Unknown"),
+        "domain_raw": parsed.get("domain_raw", "") or "",
+        "category_raw": parsed.get("category_raw", "") or "",
+        "evidence_url": row.get("evidence_url"),
+        "spu_score": spu_score,
+        "status": row.get("status"),
+    }
+
+
+class VectorIndex:
+    """Contiguous matrix of L2-normalized vectors with an id map, answering top-k by one mat-vec product."""
+
+    def __init__(self, initial_capacity: int = 1024):
+        self.dim: Optional[int] = None
+        self._matrix: Optional[np.ndarray] = None
+        self._capacity = initial_capacity
+        self.row_ids: List[str] = []
+        self.id_rows: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.row_ids)
+
+    def _grow(self) -> None:
+        self._capacity *= 2
+        grown = np.zeros((self._capacity, self.dim), dtype=np.float32)
+        grown[:len(self.row_ids)] = self._matrix[:len(self.row_ids)]
+        self._matrix = grown
+
+    def upsert(self, item_id: str, vector: np.ndarray) -> bool:
+        if self.dim is None:
+            self.dim = vector.shape[0]
+            self._matrix = np.zeros((self._capacity, self.dim), dtype=np.float32)
+        if vector.shape[0] != self.dim:
+            self.remove(item_id)
+            return False
+
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            self.remove(item_id)
+            return False
+
+        row = self.id_rows.get(item_id)
+        if row is None:
+            if len(self.row_ids) >= self._capacity:
+                self._grow()
+            row = len(self.row_ids)
+            self.row_ids.append(item_id)
+            self.id_rows[item_id] = row
+        self._matrix[row] = vector / norm
+        return True
+
+    def remove(self, item_id: str) -> None:
+        row = self.id_rows.pop(item_id, None)
+        if row is None:
+            return
+        last = len(self.row_ids) - 1
+        if row != last:
+            # Move the last row into the hole to keep the matrix contiguous
+            moved_id = self.row_ids[last]
+            self._matrix[row] = self._matrix[last]
+            self.row_ids[row] = moved_id
+            self.id_rows[moved_id] = row
+        self.row_ids.pop()
+
+    def matrix(self) -> np.ndarray:
+        if self._matrix is None:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        return self._matrix[:len(self.row_ids)]
+
+    def vector(self, item_id: str) -> Optional[np.ndarray]:
+        row = self.id_rows.get(item_id)
+        return self._matrix[row].copy() if row is not None else None
+
+    def search(self, query: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        q = normalize_query(query, self.dim)
+        count = len(self.row_ids)
+        if q is None or count == 0 or k <= 0:
+            return []
+
+        sims = self._matrix[:count] @ q
+        if k < count:
+            top = np.argpartition(-sims, k - 1)[:k]
+        else:
+            top = np.arange(count)
+        top = top[np.argsort(-sims[top])]
+        return [(self.row_ids[i], float(sims[i])) for i in top]
+
+    def similarity(self, item_id: str, query: np.ndarray) -> Optional[float]:
+        row = self.id_rows.get(item_id)
+        q = normalize_query(query, self.dim)
+        if row is None or q is None:
+            return None
+        return float(self._matrix[row] @ q)
+
+
+class CertificateSearchIndex:
+    """In-process copy of every searchable certificate: display fields plus its embedding.
+
+    With the "ivf" backend most vectors live in a saved IVFFlatIndex and
+    `vectors` only holds rows written since that build; compaction folds
+    them back into a new build once they pass SEARCH_IVF_COMPACT_RATIO.
+    """
+
+    def __init__(self, backend: str = service_settings.SEARCH_ANN_BACKEND):
+        self.backend = backend
+        self.records: Dict[str, Dict[str, Any]] = {}
+        self.vectors = VectorIndex()
+        self.lexical = BM25Index()
+        self.ann: Optional[IVFFlatIndex] = None
+        self.ready = False
+        self.loaded_at = 0.0
+        self.compacting = False
+        self.reloading = False
+        self._dirty: Optional[Set[str]] = None
+        self._touched: Optional[Set[str]] = None
+        self._lock = threading.RLock()
+        self._load_lock: Optional[asyncio.Lock] = None
+
+    @property
+    def dim(self) -> Optional[int]:
+        return self.ann.meta["dim"] if self.ann is not None else self.vectors.dim
+
+    def upsert_row(self, row: Dict[str, Any]) -> None:
+        cert_id = row.get("id")
+        if not cert_id:
+            return
+        with self._lock:
+            if row.get("status") not in SEARCHABLE_STATUSES:
+                self.remove(cert_id)
+                return
+            record = self.records[cert_id] = record_from_row(row)
+            self.lexical.add(cert_id, lexical_text(record))
+            vector = row_embedding(row)
+            if vector is None:
+                self.vectors.remove(cert_id)
+            else:
+                self.vectors.upsert(cert_id, vector)
+            self._forget_saved(cert_id)
+
+    def remove(self, cert_id: str) -> None:
+        with self._lock:
+            self.records.pop(cert_id, None)
+            self.vectors.remove(cert_id)
+            self.lexical.remove(cert_id)
+            self._forget_saved(cert_id)
+
+    def _forget_saved(self, cert_id: str) -> None:
+        # The saved build is read-only; the current value now lives in `vectors`
+        if self.ann is not None:
+            self.ann.mark_deleted(cert_id)
+        if self._dirty is not None:
+            self._dirty.add(cert_id)
+        if self._touched is not None:
+            self._touched.add(cert_id)
+
+    def search(self, query: np.ndarray, k: int, nprobe: int = service_settings.SEARCH_IVF_NPROBE) -> List[Tuple[str, float]]:
+        with self._lock:
+            q = normalize_query(query, self.dim)
+            if q is None:
+                return []
+            results = self.vectors.search(q, k)
+            if self.ann is not None:
+                results += self.ann.search(q, k, nprobe)
+        results.sort(key=lambda item: item[1], reverse=True)
+        return results[:k]
+
+    def lexical_search(self, query: str) -> Dict[str, float]:
+        with self._lock:
+            return self.lexical.search(query)
+
+    def similarity(self, cert_id: str, query: np.ndarray) -> Optional[float]:
+        with self._lock:
+            sim = self.vectors.similarity(cert_id, query)
+            if sim is None and self.ann is not None:
+                q = normalize_query(query, self.dim)
+                sim = self.ann.similarity(cert_id, q) if q is not None else None
+            return sim
+
+    def get(self, cert_id: str) -> Optional[Dict[str, Any]]:
+        return self.records.get(cert_id)
+
+    def all_records(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self.records.values())
+
+    def _pages(self, columns: str):
+        db = get_db()
+        page_size = service_settings.SEARCH_INDEX_PAGE_SIZE
+        last_id = None
+        while True:
+            query = db.table("certificates").select(columns)\
+                .in_("status", SEARCHABLE_STATUSES)\
+                .order("id")\
+                .limit(page_size)
+            if last_id is not None:
+                query = query.gt("id", last_id)
+            rows = query.execute().data
+            if not rows:
+                return
+            yield rows
+            last_id = rows[-1]["id"]
+
+    def _fetch_embeddings(self, cert_ids: List[str], vectors: VectorIndex, column: str = "embedding_q") -> None:
+        db = get_db()
+        page_size = service_settings.SEARCH_INDEX_PAGE_SIZE
+        unpacked = []
+        for start in range(0, len(cert_ids), page_size):
+            chunk = cert_ids[start:start + page_size]
+            rows = db.table("certificates").select(f"id, {column}").in_("id", chunk).execute().data
+            for row in rows:
+                vector = decode_embedding(row.get(column))
+                if vector is not None:
+                    vectors.upsert(row["id"], vector)
+                elif column != LEGACY_EMBEDDING_COLUMN:
+                    unpacked.append(row["id"])
+        if unpacked:
+            # Only rows without embedding_q pay for the JSON column
+            self._fetch_embeddings(unpacked, vectors, LEGACY_EMBEDDING_COLUMN)
+
+    def _build_ann(self, ids: List[str], matrix: np.ndarray, source_at: float) -> IVFFlatIndex:
+        """`source_at`: when the table was read for these vectors; rows changed later are re-fetched on load"""
+        ann = IVFFlatIndex.build(
+            ids,
+            matrix,
+            nlist=service_settings.SEARCH_IVF_NLIST,
+            iterations=service_settings.SEARCH_IVF_TRAIN_ITERATIONS,
+            meta={"model": service_settings.SEARCH_EMBEDDING_MODEL, "source_at": source_at},
+        )
+        ann.save(service_settings.SEARCH_INDEX_DIR)
+        logging.info(f"Built IVF search index: {len(ann)} vectors in {ann.nlist} lists, {ann.meta['build_seconds']}s")
+        return ann
+
+    def _load_ann(self) -> Optional[IVFFlatIndex]:
+        ann = IVFFlatIndex.load(service_settings.SEARCH_INDEX_DIR)
+        if ann is not None and ann.meta.get("model") != service_settings.SEARCH_EMBEDDING_MODEL:
+            logging.info(f"Ignoring saved search index built for {ann.meta.get('model')}")
+            return None
+        if ann is not None and "source_at" not in ann.meta:
+            logging.info("Ignoring saved search index without a source time")
+            return None
+        return ann
+
+    def rebuild(self) -> None:
+        """Reload every searchable certificate, reusing the saved IVF build when there is one"""
+        # 1. A saved build means only the display fields have to come from the database
+        loaded_at = time.time()
+        ann = self._load_ann() if self.backend == "ivf" else None
+        columns = SAVED_BUILD_SELECT if ann is not None else INDEX_SELECT
+        changed: List[str] = []
+
+        records: Dict[str, Dict[str, Any]] = {}
+        vectors = VectorIndex()
+        lexical = BM25Index()
+        unpacked: List[str] = []
+        for rows in self._pages(columns):
+            for row in rows:
+                record = records[row["id"]] = record_from_row(row)
+                lexical.add(row["id"], lexical_text(record))
+                if ann is not None:
+                    if changed_since(row, ann.meta["source_at"]):
+                        changed.append(row["id"])
+                else:
+                    vector = decode_embedding(row.get("embedding_q"))
+                    if vector is not None:
+                        vectors.upsert(row["id"], vector)
+                    else:
+                        unpacked.append(row["id"])
+        if unpacked:
+            self._fetch_embeddings(unpacked, vectors, LEGACY_EMBEDDING_COLUMN)
+
+        # 2. Reconcile the saved build with the table: drop gone rows, fetch rows added or re-embedded since
+        if ann is not None:
+            for cert_id in ann.id_rows:
+                if cert_id not in records:
+                    ann.mark_deleted(cert_id)
+            for cert_id in changed:
+                ann.mark_deleted(cert_id)
+            stale = set(changed)
+            self._fetch_embeddings([cert_id for cert_id in records if cert_id in stale or cert_id not in ann.id_rows], vectors)
+        elif self.backend == "ivf" and len(vectors) >= service_settings.SEARCH_IVF_MIN_ROWS:
+            ann = self._build_ann(vectors.row_ids, vectors.matrix(), loaded_at)
+            vectors = VectorIndex()
+
+        with self._lock:
+            self.records = records
+            self.vectors = vectors
+            self.lexical = lexical
+            self.ann = ann
+            self.ready = True
+            self.loaded_at = loaded_at
+        bump_certificate_version()
+        logging.info(f"Search index loaded {len(records)} certificates, {len(vectors) + (ann.live if ann else 0)} with embeddings")
+
+    def reload(self) -> None:
+        """Catch up with writes made through other API workers.
+
+        Display fields of every row are re-read; embeddings are only fetched
+        for rows re-embedded since the last load or new to this process.
+        """
+        with self._lock:
+            if not self.ready or self.compacting or self.reloading:
+                return
+            self.reloading = True
+            self._touched = set()
+            source_at = self.loaded_at
+            known = set(self.records)
+            ann = self.ann
+        loaded_at = time.time()
+
+        try:
+            records: Dict[str, Dict[str, Any]] = {}
+            lexical = BM25Index()
+            unchanged: List[str] = []
+            changed: List[str] = []
+            for rows in self._pages(SAVED_BUILD_SELECT):
+                for row in rows:
+                    record = records[row["id"]] = record_from_row(row)
+                    lexical.add(row["id"], lexical_text(record))
+                    (changed if changed_since(row, source_at) else unchanged).append(row["id"])
+
+            vectors = VectorIndex()
+            with self._lock:
+                for cert_id in unchanged:
+                    vector = self.vectors.vector(cert_id)
+                    if vector is not None:
+                        vectors.upsert(cert_id, vector)
+                    elif cert_id not in known and not (ann is not None and ann.contains(cert_id)):
+                        changed.append(cert_id)
+            self._fetch_embeddings(changed, vectors)
+
+            with self._lock:
+                if ann is not None:
+                    stale = set(changed)
+                    for cert_id in ann.id_rows:
+                        if cert_id not in records or cert_id in stale:
+                            ann.mark_deleted(cert_id)
+                self.records = records
+                self.vectors = vectors
+                self.lexical = lexical
+                self.loaded_at = loaded_at
+                touched, self._touched = self._touched, None
+        finally:
+            with self._lock:
+                self._touched = None
+                self.reloading = False
+
+        # Writes made in this process while the pass ran are re-applied on top of it
+        for cert_id in touched:
+            self.refresh(cert_id)
+        bump_certificate_version()
+        logging.info(f"Search index reloaded {len(records)} certificates, {len(changed)} embeddings fetched")
+
+    def needs_compaction(self) -> bool:
+        if self.backend != "ivf" or self.compacting or self.reloading or not self.ready:
+            return False
+        if self.ann is None:
+            return len(self.vectors) >= service_settings.SEARCH_IVF_MIN_ROWS
+        changed = len(self.vectors) + len(self.ann) - self.ann.live
+        return changed >= service_settings.SEARCH_IVF_COMPACT_RATIO * len(self.ann)
+
+    def compact(self) -> None:
+        """Fold the in-memory rows into a new saved build without blocking searches"""
+        with self._lock:
+            if self.compacting or self.reloading:
+                return
+            self.compacting = True
+            self._dirty = set()
+            # Rows are current as of the last full load, or later for ones refreshed since
+            source_at = self.loaded_at
+            ids, matrices = list(self.vectors.row_ids), [self.vectors.matrix().copy()]
+            if self.ann is not None:
+                saved_ids, saved_matrix = self.ann.live_items()
+                ids += saved_ids
+                matrices.append(saved_matrix)
+
+        try:
+            ann = self._build_ann(ids, np.concatenate(matrices), source_at) if ids else None
+            with self._lock:
+                # Rows written while the build ran stay in memory on top of it
+                vectors = VectorIndex()
+                for cert_id in self._dirty:
+                    if ann is not None:
+                        ann.mark_deleted(cert_id)
+                    vector = self.vectors.vector(cert_id)
+                    if vector is not None:
+                        vectors.upsert(cert_id, vector)
+                self.ann = ann
+                self.vectors = vectors
+        finally:
+            with self._lock:
+                self._dirty = None
+                self.compacting = False
+
+    async def ensure_loaded(self) -> None:
+        if self.ready:
+            return
+        if self._load_lock is None:
+            self._load_lock = asyncio.Lock()
+        async with self._load_lock:
+            if not self.ready:
+                await asyncio.to_thread(self.rebuild)
+
+    def refresh(self, cert_id: str) -> None:
+        """Re-read one certificate after a write so the index follows the table"""
+        if not self.ready:
+            return
+        db = get_db()
+        result = db.table("certificates").select(REFRESH_SELECT).eq("id", cert_id).execute()
+        if result.data:
+            self.upsert_row(result.data[0])
+        else:
+            self.remove(cert_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "backend": self.backend,
+            "certificates": len(self.records),
+            "vectors": len(self.vectors),
+            "dim": self.dim,
+            "lexical": self.lexical.stats(),
+            "compacting": self.compacting,
+            "reloading": self.reloading,
+            "age_seconds": round(time.time() - self.loaded_at, 1) if self.ready else None,
+            "ivf": self.ann.stats() if self.ann is not None else None,
+        }
+
+
+search_index = CertificateSearchIndex()
+register_metrics("search_index", search_index.stats)
+
+
+async def load_search_index() -> None:
+    try:
+        await search_index.ensure_loaded()
+    except Exception as e:
+        # Search retries the load on its next request
+        logging.warning(f"Could not load search index: {e}")
+
+
+_reload_lock = asyncio.Lock()
+
+
+async def reload_search_index() -> None:
+    if _reload_lock.locked():
+        return
+    async with _reload_lock:
+        try:
+            await asyncio.to_thread(search_index.reload)
+        except Exception as e:
+            logging.warning(f"Could not reload search index: {e}")
+
+
+def reload_search_index_if_stale() -> None:
+    # Writes handled by other API workers only reach this copy through a reload
+    if search_index.ready and time.time() - search_index.loaded_at > service_settings.SEARCH_INDEX_RELOAD_SECONDS:
+        spawn(reload_search_index())
+
+
+async def compact_search_index() -> None:
+    try:
+        await asyncio.to_thread(search_index.compact)
+    except Exception as e:
+        logging.warning(f"Could not compact search index: {e}")
+
+
+async def refresh_search_index(cert_id: str) -> None:
+    """Apply a certificate write to the index; a failure only leaves search stale until the next rebuild"""
+    try:
+        await asyncio.to_thread(search_index.refresh, cert_id)
+    except Exception as e:
+        logging.warning(f"Could not refresh search index for certificate {cert_id}: {e}")
+        return
+    if search_index.needs_compaction():
+        spawn(compact_search_index())
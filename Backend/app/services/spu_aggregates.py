@@ -0,0 +1,260 @@
+import asyncio
+import heapq
+import logging
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.config.database import get_db
+from app.config.settings import service_settings
+from app.services.background import spawn
+from app.services.response_cache import bump_certificate_version
+from app.services.leaderboard_index import PARTITION_FIELDS, daily_buckets, leaderboard_index, partition_key
+from app.services.certificate_stats import keyset_pages, load_certificate_frame, student_totals, weighted_scores
+
+AGGREGATES_TABLE = "student_spu_aggregates"
+LEADERBOARD_STATUSES = ["validated", "processed"]
+DAILY_TABLE = "student_spu_daily"
+AGGREGATE_FIELDS = ["student_id", "spu_score", "created_at", "nama", "nim", *PARTITION_FIELDS]
+AGGREGATE_COLUMNS = "student_id, nama, nim, fakultas, prodi, angkatan, total_spu, certificate_count, weighted_score"
+DAILY_COLUMNS = "id, student_id, day, total_spu, certificate_count"
+
+
+def aggregate_rows(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Aggregate table rows for every student in a certificate frame"""
+    totals = student_totals(frame)
+    updated_at = datetime.now().isoformat()
+    return [
+        {
+            "student_id": row.Index,
+            "nama": row.nama if isinstance(row.nama, str) else "Unknown",
+            "nim": row.nim if isinstance(row.nim, str) else "Unknown",
+            # Stored as text so partition lookups compare the same way whatever type Users uses
+            **{field: None if getattr(row, field) is None else str(getattr(row, field)) for field in PARTITION_FIELDS},
+            "total_spu": round(float(row.total_spu), 2),
+            "certificate_count": int(row.certificate_count),
+            "weighted_score": round(float(row.weighted_score), 2),
+            "updated_at": updated_at,
+        }
+        for row in totals.itertuples()
+    ]
+
+
+def daily_rows(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Per-student, per-day SPU sums (UTC day of created_at) for the daily bucket table"""
+    days = pd.to_datetime(frame["created_at"], utc=True, errors="coerce", format="ISO8601")
+    frame = frame.assign(day=days.dt.strftime("%Y-%m-%d"))
+    frame = frame[days.notna() & frame["student_id"].notna() & (frame["student_id"] != "")]
+    grouped = frame.groupby(["student_id", "day"], sort=False)["spu_score"].agg(total_spu="sum", certificate_count="size")
+    return [
+        {"student_id": student_id, "day": day, "total_spu": round(float(total_spu), 4), "certificate_count": int(count)}
+        for (student_id, day), total_spu, count in zip(grouped.index, grouped["total_spu"], grouped["certificate_count"])
+    ]
+
+
+def refresh_student_aggregate(student_id: str) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Recompute one student's row and daily buckets from their certificates, so a write never drifts them"""
+    db = get_db()
+    frame = load_certificate_frame(
+        AGGREGATE_FIELDS, inner_users=True, student_id=[student_id], status=LEADERBOARD_STATUSES
+    )
+
+    buckets = daily_rows(frame)
+    if buckets:
+        db.table(DAILY_TABLE).upsert(buckets, on_conflict="student_id,day").execute()
+    stale_days = db.table(DAILY_TABLE).delete().eq("student_id", student_id)
+    if buckets:
+        stale_days = stale_days.not_.in_("day", [b["day"] for b in buckets])
+    stale_days.execute()
+
+    aggregates = aggregate_rows(frame)
+    if not aggregates:
+        db.table(AGGREGATES_TABLE).delete().eq("student_id", student_id).execute()
+        return None, buckets
+    db.table(AGGREGATES_TABLE).upsert(aggregates[0], on_conflict="student_id").execute()
+    return aggregates[0], buckets
+
+
+async def refresh_student(student_id: Optional[str]) -> None:
+    if not student_id:
+        return
+    try:
+        aggregate, buckets = await asyncio.to_thread(refresh_student_aggregate, student_id)
+    except Exception as e:
+        logging.warning(f"Could not refresh SPU aggregate for student {student_id}: {e}")
+        return
+    if not leaderboard_index.ready:
+        return
+    if aggregate is None:
+        leaderboard_index.remove(student_id)
+    else:
+        leaderboard_index.upsert(aggregate)
+    daily_buckets.replace_student(student_id, buckets)
+
+
+def rebuild_aggregates(page_size: int = 1000, write_size: int = 500) -> int:
+    """Recompute every student's row and daily buckets from the certificates table and drop stale ones"""
+    db = get_db()
+    frame = load_certificate_frame(AGGREGATE_FIELDS, page_size, inner_users=True, status=LEADERBOARD_STATUSES)
+    aggregates = aggregate_rows(frame)
+    for start in range(0, len(aggregates), write_size):
+        db.table(AGGREGATES_TABLE).upsert(aggregates[start:start + write_size], on_conflict="student_id").execute()
+
+    current = {a["student_id"] for a in aggregates}
+    stale = [
+        row["student_id"]
+        for row in keyset_pages(AGGREGATES_TABLE, "student_id", "student_id", page_size)
+        if row["student_id"] not in current
+    ]
+    for start in range(0, len(stale), write_size):
+        db.table(AGGREGATES_TABLE).delete().in_("student_id", stale[start:start + write_size]).execute()
+
+    buckets = daily_rows(frame)
+    for start in range(0, len(buckets), write_size):
+        db.table(DAILY_TABLE).upsert(buckets[start:start + write_size], on_conflict="student_id,day").execute()
+
+    current_days = {(b["student_id"], b["day"]) for b in buckets}
+    stale_ids = [
+        row["id"]
+        for row in keyset_pages(DAILY_TABLE, DAILY_COLUMNS, "id", page_size)
+        if (row["student_id"], str(row["day"])[:10]) not in current_days
+    ]
+    for start in range(0, len(stale_ids), write_size):
+        db.table(DAILY_TABLE).delete().in_("id", stale_ids[start:start + write_size]).execute()
+    return len(aggregates)
+
+
+def top_aggregates(limit: int, **filters: Any) -> List[Dict[str, Any]]:
+    db = get_db()
+    query = db.table(AGGREGATES_TABLE).select(AGGREGATE_COLUMNS)
+    for field, value in filters.items():
+        if value not in (None, ""):
+            query = query.eq(field, str(value))
+    return query.order("weighted_score", desc=True).limit(limit).execute().data
+
+
+def load_leaderboard_index(page_size: int = 1000) -> None:
+    # Buckets first: the index's ready flag is what tells readers both are loaded
+    daily_buckets.rebuild(list(keyset_pages(DAILY_TABLE, DAILY_COLUMNS, "id", page_size)))
+    leaderboard_index.rebuild(list(keyset_pages(AGGREGATES_TABLE, AGGREGATE_COLUMNS, "student_id", page_size)))
+    # Cached responses were built from the previous copy
+    bump_certificate_version()
+    logging.info(f"Leaderboard index loaded {len(leaderboard_index.students)} students, {len(daily_buckets.ordered)} days")
+
+
+_reload_lock = asyncio.Lock()
+
+
+async def reload_leaderboard_index(wait: bool = False) -> None:
+    if _reload_lock.locked():
+        if wait:
+            async with _reload_lock:
+                pass
+        return
+    async with _reload_lock:
+        try:
+            await asyncio.to_thread(load_leaderboard_index)
+        except Exception as e:
+            logging.warning(f"Could not load leaderboard index: {e}")
+
+
+def _reload_if_stale() -> None:
+    # Writes handled by other API workers only reach this copy through a reload
+    if time.monotonic() - leaderboard_index.loaded_at > service_settings.LEADERBOARD_RELOAD_SECONDS:
+        spawn(reload_leaderboard_index())
+
+
+async def leaderboard_top(limit: int, **filters: Any) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """Top rows of a leaderboard partition and its size; reads the table directly until the index has loaded"""
+    if leaderboard_index.ready:
+        _reload_if_stale()
+        return leaderboard_index.top(limit, filters)
+
+    spawn(reload_leaderboard_index())
+    return await asyncio.to_thread(top_aggregates, limit, **filters), None
+
+
+def period_window(period: str, today: date) -> Tuple[str, Optional[date], date]:
+    """(label, first day, last day) of a leaderboard period; first day is None for all-time
+
+    "semester" is the current academic semester (Ganjil: August-January,
+    Genap: February-July), "year" the calendar year to date and "<N>d" the
+    last N days including today.
+    """
+    period = (period or "all").strip().lower()
+    if period == "all":
+        return "all", None, today
+    if period == "semester":
+        if today.month >= 8:
+            return f"{today.year}/{today.year + 1} Ganjil", date(today.year, 8, 1), today
+        if today.month == 1:
+            return f"{today.year - 1}/{today.year} Ganjil", date(today.year - 1, 8, 1), today
+        return f"{today.year - 1}/{today.year} Genap", date(today.year, 2, 1), today
+    if period == "year":
+        return str(today.year), date(today.year, 1, 1), today
+    if period.endswith("d") and period[:-1].isdigit() and int(period[:-1]) > 0:
+        return period, today - timedelta(days=int(period[:-1]) - 1), today
+    raise ValueError(f"Unknown leaderboard period {period!r}; use all, semester, year or <N>d")
+
+
+def leaderboard_entry(rank: int, student_id: str, total_spu: float, count: int, weighted: float, last_day: Optional[date]) -> Dict[str, Any]:
+    student = leaderboard_index.students.get(student_id) or {}
+    return {
+        "student_id": student_id,
+        "student_name": student.get("nama") or "Unknown",
+        "total_spu": round(total_spu, 2),
+        "rank": rank,
+        "certificates_count": count,
+        "last_achievement": last_day,
+        "weighted_score": round(weighted, 2),
+    }
+
+
+def window_leaderboard(period: str, limit: int, today: date, **filters: Any) -> Dict[str, Any]:
+    """LeaderboardSPU fields for a period, ranked by weighted score within the window"""
+    label, start, end = period_window(period, today)
+
+    if start is None:
+        rows, total = leaderboard_index.top(limit, filters)
+        entries = [
+            leaderboard_entry(
+                rank, r["student_id"], r["total_spu"], r["certificate_count"], r["weighted_score"],
+                daily_buckets.last_day(r["student_id"]),
+            )
+            for rank, r in enumerate(rows, 1)
+        ]
+        return {"period": label, "entries": entries, "total_students": total}
+
+    merged = daily_buckets.window(start, end)
+    wanted = partition_key(filters)
+    if wanted:
+        students = leaderboard_index.students
+        merged = {
+            student_id: entry for student_id, entry in merged.items()
+            if all(students.get(student_id, {}).get(field) == value for field, value in wanted)
+        }
+
+    student_ids = list(merged)
+    totals = np.array([merged[s][0] for s in student_ids], dtype=np.float64)
+    counts = np.array([merged[s][1] for s in student_ids], dtype=np.int64)
+    weighted = weighted_scores(totals, counts)
+    top = heapq.nsmallest(limit, range(len(student_ids)), key=lambda i: (-weighted[i], student_ids[i]))
+    entries = [
+        leaderboard_entry(rank, student_ids[i], float(totals[i]), int(counts[i]), float(weighted[i]), merged[student_ids[i]][2])
+        for rank, i in enumerate(top, 1)
+    ]
+    return {"period": label, "entries": entries, "total_students": len(student_ids)}
+
+
+async def leaderboard_period(period: str, limit: int, **filters: Any) -> Dict[str, Any]:
+    # Windows are only answered from the daily buckets, so the first request waits for the load
+    if not leaderboard_index.ready:
+        await reload_leaderboard_index(wait=True)
+        if not leaderboard_index.ready:
+            raise RuntimeError("Leaderboard index could not be loaded")
+    else:
+        _reload_if_stale()
+    return window_leaderboard(period, limit, date.today(), **filters)
@@ -0,0 +1,4 @@
+-- SHA256 of the uploaded file bytes, checked before OCR to reject exact re-uploads
+alter table certificates add column if not exists file_sha256 text;
+
+create index if not exists certificates_file_sha256_idx on certificates (file_sha256);
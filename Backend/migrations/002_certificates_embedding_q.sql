@@ -0,0 +1,4 @@
+-- Embedding packed by app.services.embedding_codec (base64 of header + float16, or scale + int8).
+-- Search reads this instead of the JSON float list in "embedding"; fill existing rows with
+--   python -m scripts.migrate_embeddings
+alter table certificates add column if not exists embedding_q text;
@@ -0,0 +1,26 @@
+-- Cleaned OCR text kept at upload so embeddings can be recomputed without re-running OCR
+alter table certificates add column if not exists cleaned_text text;
+
+-- Bulk write used by scripts/reembed_certificates.py: one call updates a whole batch.
+-- The embedding is cast to whatever type certificates.embedding has (jsonb, json or vector).
+create or replace function bulk_set_embeddings(rows jsonb) returns integer
+language plpgsql as $$
+declare
+    embedding_type text;
+    updated integer;
+begin
+    select format_type(atttypid, atttypmod) into embedding_type
+    from pg_attribute
+    where attrelid = 'certificates'::regclass and attname = 'embedding';
+
+    execute format(
+        'update certificates c
+         set embedding = (r.embedding)::text::%s, embedding_q = r.embedding_q
+         from jsonb_to_recordset($1) as r(id text, embedding jsonb, embedding_q text)
+         where c.id::text = r.id',
+        embedding_type
+    ) using rows;
+    get diagnostics updated = row_count;
+    return updated;
+end;
+$$;
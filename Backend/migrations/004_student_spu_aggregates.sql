@@ -0,0 +1,15 @@
+-- One row per student with leaderboard totals over validated/processed certificates.
+-- Kept current by app.services.spu_aggregates on every certificate write;
+-- rebuild from scratch with: python -m scripts.rebuild_spu_aggregates
+create table if not exists student_spu_aggregates (
+    student_id text primary key,
+    nama text,
+    nim text,
+    total_spu double precision not null default 0,
+    certificate_count integer not null default 0,
+    weighted_score double precision not null default 0,
+    updated_at timestamptz not null default now()
+);
+
+create index if not exists student_spu_aggregates_weighted_score_idx
+    on student_spu_aggregates (weighted_score desc);
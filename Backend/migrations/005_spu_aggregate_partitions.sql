@@ -0,0 +1,14 @@
+-- Partition columns for per-fakultas/prodi/angkatan leaderboards, copied from
+-- Users by app.services.spu_aggregates. Existing rows stay null until
+-- python -m scripts.rebuild_spu_aggregates is run after applying this.
+alter table student_spu_aggregates
+    add column if not exists fakultas text,
+    add column if not exists prodi text,
+    add column if not exists angkatan text;
+
+create index if not exists student_spu_aggregates_fakultas_idx
+    on student_spu_aggregates (fakultas, weighted_score desc);
+create index if not exists student_spu_aggregates_prodi_idx
+    on student_spu_aggregates (prodi, weighted_score desc);
+create index if not exists student_spu_aggregates_angkatan_idx
+    on student_spu_aggregates (angkatan, weighted_score desc);
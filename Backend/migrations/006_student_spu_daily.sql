@@ -0,0 +1,14 @@
+-- Per-student SPU sums for each day (UTC day of certificates.created_at), so a
+-- semester, year or rolling N-day leaderboard merges buckets instead of
+-- scanning certificates. Kept current by app.services.spu_aggregates; fill
+-- with python -m scripts.rebuild_spu_aggregates after applying this.
+create table if not exists student_spu_daily (
+    id bigint generated always as identity primary key,
+    student_id text not null,
+    day date not null,
+    total_spu double precision not null default 0,
+    certificate_count integer not null default 0,
+    unique (student_id, day)
+);
+
+create index if not exists student_spu_daily_day_idx on student_spu_daily (day);
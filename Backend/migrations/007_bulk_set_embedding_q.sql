@@ -0,0 +1,14 @@
+-- Bulk write used by scripts/migrate_embeddings.py: one call packs a whole page.
+create or replace function bulk_set_embedding_q(rows jsonb) returns integer
+language plpgsql as $$
+declare
+    updated integer;
+begin
+    update certificates c
+    set embedding_q = r.embedding_q
+    from jsonb_to_recordset(rows) as r(id text, embedding_q text)
+    where c.id::text = r.id;
+    get diagnostics updated = row_count;
+    return updated;
+end;
+$$;
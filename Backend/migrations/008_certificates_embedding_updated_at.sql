@@ -0,0 +1,22 @@
+-- When a certificate's embedding last changed. app.services.search_index keeps
+-- the time its saved IVF build was read from the table and re-fetches rows
+-- changed after it instead of trusting the saved vectors. Existing rows get the
+-- migration time, so the first load after applying this re-reads them once.
+alter table certificates add column if not exists embedding_updated_at timestamptz not null default now();
+
+create or replace function touch_embedding_updated_at() returns trigger
+language plpgsql as $$
+begin
+    if tg_op = 'INSERT'
+        or new.embedding_q is distinct from old.embedding_q
+        or new.embedding::text is distinct from old.embedding::text then
+        new.embedding_updated_at = now();
+    end if;
+    return new;
+end;
+$$;
+
+drop trigger if exists certificates_embedding_updated_at on certificates;
+create trigger certificates_embedding_updated_at
+    before insert or update on certificates
+    for each row execute function touch_embedding_updated_at();
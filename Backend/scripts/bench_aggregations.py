@@ -0,0 +1,105 @@
+"""Compare the columnar certificate aggregates with the per-row loops they replaced.
+
+    python -m scripts.bench_aggregations [--rows 10000 100000 1000000] [--certificates-per-student 20]
+
+Builds synthetic certificates in both shapes the API receives them in:
+nested JSON rows for the old loops, flattened PostgREST rows for
+app.services.certificate_stats. Times status/level counts and the
+per-student weighted ranking, reports the columnar time split into
+building the frame from the row dicts and aggregating it, and checks that
+both produce the same counts and top students.
+"""
+import argparse
+import math
+import random
+import time
+from typing import Any, Dict, List, Tuple
+
+import pandas as pd
+
+from app.services.certificate_stats import certificate_frame, top_students, value_counts
+
+STATUSES = ["validated", "processed", "pending", "rejected"]
+LEVELS = ["Kampus", "Nasional", "Internasional", "Provinsi"]
+
+
+def synthetic_rows(n: int, per_student: int, seed: int = 7) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    rng = random.Random(seed)
+    students = max(1, n // per_student)
+    nested, flat = [], []
+    for i in range(n):
+        student = f"student-{rng.randrange(students)}"
+        status, level, spu = rng.choice(STATUSES), rng.choice(LEVELS), round(rng.random(), 4)
+        nested.append({
+            "student_id": student,
+            "status": status,
+            "parsed": {"level_raw": level, "event_name": f"Lomba {i}"},
+            "after_normalized": {"spu_score": spu, "rank_norm": 0.5},
+        })
+        flat.append({"id": i, "student_id": student, "status": status, "level_raw": level, "spu_score": spu})
+    return nested, flat
+
+
+def loop_aggregates(rows: List[Dict[str, Any]], limit: int) -> Tuple[Dict[str, int], List[str]]:
+    counts = {"validated": 0, "processed": 0, "kampus": 0, "nasional": 0, "internasional": 0}
+    student_stats: Dict[str, Dict[str, float]] = {}
+    for r in rows:
+        status = (r.get("status") or "").lower()
+        if status in counts:
+            counts[status] += 1
+        level = ((r.get("parsed") or {}).get("level_raw") or "").lower()
+        if level in counts:
+            counts[level] += 1
+
+        try:
+            spu = float((r.get("after_normalized") or {}).get("spu_score", 0.0))
+        except (ValueError, TypeError):
+            spu = 0.0
+        stats = student_stats.setdefault(r["student_id"], {"total_spu": 0.0, "count": 0})
+        stats["total_spu"] += spu
+        stats["count"] += 1
+
+    scored = [
+        (stats["total_spu"] * (1 + 0.1 * math.log(1 + stats["count"])), student_id)
+        for student_id, stats in student_stats.items()
+    ]
+    scored.sort(reverse=True)
+    return counts, [student_id for _, student_id in scored[:limit]]
+
+
+def columnar_aggregates(frame: pd.DataFrame, limit: int) -> Tuple[Dict[str, int], List[str]]:
+    counts = {**value_counts(frame, "status"), **value_counts(frame, "level_raw")}
+    return counts, list(top_students(frame, limit).index)
+
+
+def timed(fn, *args) -> Tuple[float, Any]:
+    started = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - started, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--certificates-per-student", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'rows':>9s} {'loops':>10s} {'columnar':>10s} {'(frame':>10s} {'+ aggregate)':>12s} "
+          f"{'speedup':>8s}  top-{args.limit} match")
+    for n in args.rows:
+        nested, flat = synthetic_rows(n, args.certificates_per_student)
+        loop_time, (loop_counts, loop_top) = timed(loop_aggregates, nested, args.limit)
+        del nested
+        frame_time, frame = timed(certificate_frame, flat, ["student_id", "status", "level_raw", "spu_score"])
+        del flat
+        aggregate_time, (columnar_counts, columnar_top) = timed(columnar_aggregates, frame, args.limit)
+        columnar_time = frame_time + aggregate_time
+
+        match = loop_top == columnar_top and all(columnar_counts.get(k, 0) == v for k, v in loop_counts.items())
+        print(f"{n:9d} {loop_time * 1000:8.1f}ms {columnar_time * 1000:8.1f}ms {frame_time * 1000:8.1f}ms "
+              f"{aggregate_time * 1000:10.1f}ms {loop_time / columnar_time:7.1f}x  {match}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Compare the torch and ONNX int8 embedding backends.
+
+    python -m scripts.bench_embedding_backends [--model all-mpnet-base-v2] [--iterations 200] [--batch-size 32]
+
+Each backend runs in its own freshly spawned process so cold start (import +
+model load) and RSS are measured from a clean interpreter. Reports cold
+start, RSS after load, single-text p50/p99 latency and batched throughput.
+Export the ONNX model first with scripts.export_onnx_model.
+"""
+import argparse
+import multiprocessing
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from app.config.settings import service_settings
+from scripts.export_onnx_model import sample_texts
+
+
+def measure(backend: str, model_name: str, iterations: int, batch_size: int) -> Dict[str, Any]:
+    started = time.perf_counter()
+    from app.services.model_registry import EMBEDDING_BACKENDS, current_rss_mb
+    model = EMBEDDING_BACKENDS[backend](model_name)
+    model.encode(["warmup"], batch_size=1)
+    cold_start = time.perf_counter() - started
+
+    texts = sample_texts()
+    latencies: List[float] = []
+    for i in range(iterations):
+        t = time.perf_counter()
+        model.encode([texts[i % len(texts)]], batch_size=1)
+        latencies.append(time.perf_counter() - t)
+
+    batch = (texts * (batch_size // len(texts) + 1))[:batch_size]
+    rounds = max(1, iterations // batch_size)
+    t = time.perf_counter()
+    for _ in range(rounds):
+        model.encode(batch, batch_size=batch_size)
+    throughput = rounds * batch_size / (time.perf_counter() - t)
+
+    return {
+        "cold_start_s": cold_start,
+        "rss_mb": current_rss_mb(),
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p99_ms": float(np.percentile(latencies, 99) * 1000),
+        "texts_per_s": throughput,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default=service_settings.SEARCH_EMBEDDING_MODEL)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    print(f"{'backend':8s} {'cold start':>11s} {'rss':>9s} {'p50':>9s} {'p99':>9s} {'throughput':>13s}")
+    for backend in ("torch", "onnx"):
+        with context.Pool(1) as pool:
+            r = pool.apply(measure, (backend, args.model, args.iterations, args.batch_size))
+        print(f"{backend:8s} {r['cold_start_s']:10.2f}s {r['rss_mb']:7.0f}MB {r['p50_ms']:7.1f}ms "
+              f"{r['p99_ms']:7.1f}ms {r['texts_per_s']:9.1f} txt/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Size, decode speed and search quality of the packed embedding formats.
+
+    python -m scripts.bench_embedding_codec [--synthetic 20000] [--k 10]
+
+Without --synthetic the vectors are the JSON embeddings in the database.
+For JSON, float16 and int8 it reports bytes per vector, decode time per
+vector, and recall@k / mean cosine drift of the exact search on decoded
+vectors against the full-precision float32 results.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from app.config.database import get_db
+from app.services.ann_index import normalize_rows
+from app.services.embedding_codec import decode_embedding, encode_embedding
+from scripts.bench_search_index import synthetic_vectors
+
+
+def database_vectors(batch_size: int = 1000) -> np.ndarray:
+    db = get_db()
+    vectors, last_id = [], None
+    while True:
+        query = db.table("certificates").select("id, embedding").not_.is_("embedding", "null").order("id").limit(batch_size)
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        rows = query.execute().data
+        if not rows:
+            break
+        vectors += [v for v in (decode_embedding(row["embedding"]) for row in rows) if v is not None]
+        last_id = rows[-1]["id"]
+    return np.stack(vectors).astype(np.float32)
+
+
+def top_k(matrix: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    sims = queries @ matrix.T
+    return np.argpartition(-sims, k - 1, axis=1)[:, :k]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--synthetic", type=int, default=0, help="use N generated vectors instead of the database")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    matrix = synthetic_vectors(args.synthetic, args.dim, 300) if args.synthetic else database_vectors()
+    print(f"{matrix.shape[0]} vectors, dim {matrix.shape[1]}")
+
+    rng = np.random.default_rng(1)
+    picks = rng.choice(matrix.shape[0], min(args.queries, matrix.shape[0]), replace=False)
+    queries = normalize_rows(matrix[picks] + 0.3 * rng.standard_normal((len(picks), matrix.shape[1])).astype(np.float32))
+    reference = normalize_rows(matrix)
+    truth = top_k(reference, queries, args.k)
+
+    encoders = {
+        "json": lambda v: json.dumps(v.tolist()),
+        "float16": lambda v: encode_embedding(v, "float16"),
+        "int8": lambda v: encode_embedding(v, "int8"),
+    }
+    for name, encode in encoders.items():
+        encoded = [encode(v) for v in matrix]
+        started = time.perf_counter()
+        decoded = np.stack([decode_embedding(value) for value in encoded])
+        decode_us = (time.perf_counter() - started) / len(encoded) * 1e6
+
+        decoded = normalize_rows(decoded)
+        found = top_k(decoded, queries, args.k)
+        recall = np.mean([len(set(f) & set(t)) / args.k for f, t in zip(found, truth)])
+        drift = np.mean(1 - np.sum(decoded * reference, axis=1))
+        size = np.mean([len(value) for value in encoded])
+        print(f"{name:8s} {size:9.0f} bytes/vector   decode {decode_us:7.2f} us/vector   "
+              f"recall@{args.k} {recall:.4f}   cosine drift {drift:.2e}")
+
+
+if __name__ == "__main__":
+    main()
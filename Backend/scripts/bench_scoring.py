@@ -0,0 +1,113 @@
+"""Golden check and micro-benchmark for the certificate rule engine.
+
+    python -m scripts.bench_scoring [--iterations 20000]
+
+First verifies every case in scripts/data/scoring_golden.json against
+app.controllers.certificates.scoring (exits 1 on any mismatch), then times the
+per-rule compiled engine against the previous per-call re.search cascade.
+"""
+import argparse
+import json
+import re
+import sys
+import timeit
+from pathlib import Path
+
+from app.controllers.certificates.scoring import (
+    regex_parse_certificate,
+    norm_rank,
+    norm_level,
+    norm_category,
+)
+
+GOLDEN_PATH = Path(__file__).resolve().parent / "data" / "scoring_golden.json"
+
+FUNCTIONS = {
+    "parse": regex_parse_certificate,
+    "rank": norm_rank,
+    "level": norm_level,
+    "category": norm_category,
+}
+
+
+# Previous implementation, with the escaping fixed so both sides do the same work
+def cascade_parse(raw_text):
+    parsed = {"nama_mahasiswa": "Nama Tidak Terbaca", "rank_raw": "Unknown", "level_raw": "Unknown"}
+    text = raw_text.lower()
+    for pattern in [
+        r"(?:nama|name)[:\s-]*([A-Z][a-zA-Z\s]{5,50})",
+        r"(?:diberikan kepada|presented to|awarded to)[:\s-]*([A-Z][a-zA-Z\s]{5,50})"
+    ]:
+        match = re.search(pattern, raw_text, re.IGNORECASE)
+        if match:
+            parsed["nama_mahasiswa"] = match.group(1).strip()
+            break
+    if re.search(r"\b(juara\s*1|juara\s*pertama|1st|first|champion|gold)\b", text):
+        parsed["rank_raw"] = "Juara 1"
+    elif re.search(r"\b(juara\s*2|juara\s*kedua|2nd|second|silver)\b", text):
+        parsed["rank_raw"] = "Juara 2"
+    elif re.search(r"\b(juara\s*3|juara\s*ketiga|3rd|third|bronze)\b", text):
+        parsed["rank_raw"] = "Juara 3"
+    if re.search(r"\b(international|internasional)\b", text):
+        parsed["level_raw"] = "Internasional"
+    elif re.search(r"\b(nasional|national)\b", text):
+        parsed["level_raw"] = "Nasional"
+    return parsed
+
+
+def cascade_rank(rank):
+    s = str(rank).lower()
+    if re.search(r"(juara\s*(1|i\b)|1st|first|champion|gold|emas)", s):
+        return 5
+    if re.search(r"(juara\s*(2|ii\b)|2nd|second|silver|perak)", s):
+        return 4
+    if re.search(r"(juara\s*(3|iii\b)|3rd|third|bronze|perunggu)", s):
+        return 3
+    if "final" in s:
+        return 2
+    return 1
+
+
+def check_golden() -> int:
+    cases = json.loads(GOLDEN_PATH.read_text())
+    failures = 0
+    for case in cases:
+        actual = FUNCTIONS[case["kind"]](case["input"])
+        if actual != case["expected"]:
+            failures += 1
+            print(f"MISMATCH {case['kind']} {case['input']!r}: expected {case['expected']!r}, got {actual!r}")
+    print(f"golden: {len(cases) - failures}/{len(cases)} cases match")
+    return failures
+
+
+def bench(iterations: int) -> None:
+    cases = json.loads(GOLDEN_PATH.read_text())
+    texts = [c["input"] for c in cases if c["kind"] == "parse"]
+    ranks = [c["input"] for c in cases if c["kind"] == "rank"]
+
+    rows = [
+        ("regex_parse_certificate", lambda: [regex_parse_certificate(t) for t in texts],
+         lambda: [cascade_parse(t) for t in texts], len(texts)),
+        ("norm_rank", lambda: [norm_rank(r) for r in ranks],
+         lambda: [cascade_rank(r) for r in ranks], len(ranks)),
+    ]
+    for name, engine, cascade, size in rows:
+        loops = max(1, iterations // size)
+        engine_us = timeit.timeit(engine, number=loops) / (loops * size) * 1e6
+        cascade_us = timeit.timeit(cascade, number=loops) / (loops * size) * 1e6
+        print(f"{name:24s} engine {engine_us:8.2f} us/call   cascade {cascade_us:8.2f} us/call   "
+              f"speedup {cascade_us / engine_us:5.2f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    if check_golden():
+        sys.exit(1)
+    bench(args.iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Recall and latency of the IVF search backend against the exact scan.
+
+    python -m scripts.bench_search_index [--synthetic 100000] [--k 10] [--nprobe 1,2,4,8,16,32]
+
+Without --synthetic the vectors are the certificate embeddings in the
+database. Queries are stored vectors plus noise; recall@k is the share of
+the exact top-k (the semantic candidates search_certificates_similarity
+uses) that the IVF index also returns.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.config.settings import service_settings
+from app.services.ann_index import IVFFlatIndex, normalize_rows
+from app.services.embedding_codec import decode_embedding
+from app.services.search_index import CertificateSearchIndex, INDEX_SELECT, VectorIndex
+
+
+def synthetic_vectors(rows: int, dim: int, clusters: int, seed: int = 0) -> np.ndarray:
+    # Clustered like real embeddings, where certificates of a kind sit close together
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, rows)
+    return normalize_rows(centers[labels] + 0.6 * rng.standard_normal((rows, dim)).astype(np.float32))
+
+
+def database_vectors() -> np.ndarray:
+    vectors = []
+    for rows in CertificateSearchIndex(backend="exact")._pages(INDEX_SELECT):
+        for row in rows:
+            vector = decode_embedding(row.get("embedding_q"))
+            if vector is not None:
+                vectors.append(vector)
+    dims = {v.shape[0] for v in vectors}
+    if len(dims) > 1:
+        raise SystemExit(f"embeddings have mixed dimensions {sorted(dims)}")
+    return normalize_rows(np.stack(vectors).astype(np.float32))
+
+
+def timed(fn, queries):
+    started = time.perf_counter()
+    results = [fn(q) for q in queries]
+    return results, (time.perf_counter() - started) / len(queries) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--synthetic", type=int, default=0, help="use N generated vectors instead of the database")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--clusters", type=int, default=300)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=service_settings.SEARCH_IVF_NLIST)
+    parser.add_argument("--nprobe", default="1,2,4,8,16,32")
+    args = parser.parse_args()
+
+    matrix = synthetic_vectors(args.synthetic, args.dim, args.clusters) if args.synthetic else database_vectors()
+    ids = [str(i) for i in range(matrix.shape[0])]
+    print(f"{matrix.shape[0]} vectors, dim {matrix.shape[1]}")
+
+    rng = np.random.default_rng(1)
+    picks = rng.choice(matrix.shape[0], min(args.queries, matrix.shape[0]), replace=False)
+    queries = normalize_rows(matrix[picks] + 0.3 * rng.standard_normal((len(picks), matrix.shape[1])).astype(np.float32))
+
+    exact = VectorIndex(initial_capacity=matrix.shape[0])
+    for item_id, vector in zip(ids, matrix):
+        exact.upsert(item_id, vector)
+    truth, exact_ms = timed(lambda q: {i for i, _ in exact.search(q, args.k)}, queries)
+    print(f"exact            {exact_ms:8.3f} ms/query   recall@{args.k} 1.000")
+
+    ivf = IVFFlatIndex.build(ids, matrix, nlist=args.nlist, iterations=service_settings.SEARCH_IVF_TRAIN_ITERATIONS)
+    print(f"ivf build        {ivf.meta['build_seconds']:8.2f} s   nlist {ivf.nlist}")
+    for nprobe in [int(n) for n in args.nprobe.split(",")]:
+        found, ivf_ms = timed(lambda q: {i for i, _ in ivf.search(q, args.k, nprobe)}, queries)
+        recall = np.mean([len(f & t) / len(t) for f, t in zip(found, truth)])
+        print(f"ivf nprobe={nprobe:<4d} {ivf_ms:8.3f} ms/query   recall@{args.k} {recall:.3f}")
+
+
+if __name__ == "__main__":
+    main()
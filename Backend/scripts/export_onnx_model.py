@@ -0,0 +1,142 @@
+"""Export a SentenceTransformer model to ONNX, quantize it to int8 and check parity.
+
+    python -m scripts.export_onnx_model [--model all-mpnet-base-v2 ...] [--min-cosine 0.98] [--check-only]
+
+By default exports both configured models, EMBEDDING_MODEL (ingestion) and
+SEARCH_EMBEDDING_MODEL (staff search), since EMBEDDING_BACKEND=onnx serves
+both. For each one writes <ONNX_MODEL_DIR>/<model>/ with model.onnx, model_int8.onnx,
+tokenizer.json and the pooling settings OnnxSentenceEncoder needs, then
+encodes a sample of certificate-like texts with both backends and exits 1
+if any int8 vector has a cosine similarity below --min-cosine to the torch
+one. Serve it with EMBEDDING_BACKEND=onnx.
+"""
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from app.config.settings import service_settings
+from app.controllers.certificates.certificates_controller import EMBEDDING_MODEL
+from app.services.model_registry import load_sentence_transformer
+from app.services.onnx_embedder import FLOAT_MODEL_FILE, MODEL_FILE, POOLING_CONFIG, OnnxSentenceEncoder, onnx_model_dir
+
+GOLDEN_PATH = Path(__file__).resolve().parent / "data" / "scoring_golden.json"
+
+SAMPLE_TEXTS = [
+    "AI",
+    "robotik",
+    "lomba nasional",
+    "Juara 1 Lomba Karya Tulis Ilmiah Nasional",
+    "Sertifikat Peserta Seminar Internasional Artificial Intelligence",
+    "Finalist Hackathon Smart City tingkat provinsi",
+    "Medali Perunggu Olimpiade Sains Nasional bidang Matematika",
+    "Penghargaan Best Speaker English Debate Competition",
+]
+
+
+def sample_texts() -> List[str]:
+    cases = json.loads(GOLDEN_PATH.read_text())
+    return SAMPLE_TEXTS + [c["input"] for c in cases if c["kind"] == "parse"]
+
+
+def export(model_name: str, model_dir: str) -> None:
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    class TokenEmbeddings(torch.nn.Module):
+        # Passes inputs by name and returns only last_hidden_state, whatever forward's positional order is
+        def __init__(self, auto_model, input_names):
+            super().__init__()
+            self.auto_model = auto_model
+            self.input_names = input_names
+
+        def forward(self, *inputs):
+            return self.auto_model(**dict(zip(self.input_names, inputs)), return_dict=True).last_hidden_state
+
+    model = load_sentence_transformer(model_name)
+    transformer, pooling = model[0], model[1]
+    tokenizer = transformer.tokenizer
+    os.makedirs(model_dir, exist_ok=True)
+
+    dummy = tokenizer(["sertifikat juara"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in dummy]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names + ["token_embeddings"]}
+    float_path = os.path.join(model_dir, FLOAT_MODEL_FILE)
+    torch.onnx.export(
+        TokenEmbeddings(transformer.auto_model.eval(), input_names),
+        tuple(dummy[name] for name in input_names),
+        float_path,
+        input_names=input_names,
+        output_names=["token_embeddings"],
+        dynamic_axes=dynamic_axes,
+        opset_version=14,
+        dynamo=False,
+    )
+    quantize_dynamic(float_path, os.path.join(model_dir, MODEL_FILE), weight_type=QuantType.QInt8)
+
+    # Older sentence-transformers describe pooling with one flag per mode
+    pooling_config = pooling.get_config_dict()
+    pooling_mode = pooling_config.get("pooling_mode") or ("cls" if pooling_config.get("pooling_mode_cls_token") else "mean")
+    if pooling_mode not in ("cls", "mean"):
+        raise SystemExit(f"unsupported pooling mode {pooling_mode}")
+
+    tokenizer.save_pretrained(model_dir)
+    config = {
+        "model": model_name,
+        "pooling": pooling_mode,
+        "normalize": any(type(module).__name__ == "Normalize" for module in model),
+        "max_seq_length": model.max_seq_length,
+        "pad_token": tokenizer.pad_token,
+        "pad_token_id": tokenizer.pad_token_id,
+    }
+    with open(os.path.join(model_dir, POOLING_CONFIG), "w") as f:
+        json.dump(config, f, indent=2)
+    print(f"exported {model_name} to {model_dir}")
+
+
+def cosine_rows(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return np.sum(a * b, axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+
+
+def check_parity(model_name: str, model_dir: str, min_cosine: float) -> bool:
+    texts = sample_texts()
+    reference = load_sentence_transformer(model_name).encode(texts, batch_size=16)
+    ok = True
+    for label, quantized in (("float", False), ("int8", True)):
+        encoder = OnnxSentenceEncoder(model_dir, quantized=quantized)
+        cosines = cosine_rows(reference, encoder.encode(texts, batch_size=16))
+        print(f"{label:6s} cosine vs torch over {len(texts)} texts: min {cosines.min():.5f}  mean {cosines.mean():.5f}")
+        if quantized and cosines.min() < min_cosine:
+            worst = texts[int(cosines.argmin())]
+            print(f"int8 parity below {min_cosine} on {worst[:60]!r}")
+            ok = False
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--model",
+        nargs="+",
+        default=list(dict.fromkeys([EMBEDDING_MODEL, service_settings.SEARCH_EMBEDDING_MODEL])),
+    )
+    parser.add_argument("--min-cosine", type=float, default=0.98)
+    parser.add_argument("--check-only", action="store_true", help="skip the export and only compare outputs")
+    args = parser.parse_args()
+
+    ok = True
+    for model_name in args.model:
+        model_dir = onnx_model_dir(service_settings.ONNX_MODEL_DIR, model_name)
+        if not args.check_only:
+            export(model_name, model_dir)
+        ok = check_parity(model_name, model_dir, args.min_cosine) and ok
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
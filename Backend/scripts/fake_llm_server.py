@@ -0,0 +1,52 @@
+"""Local stand-in for the Groq chat completions API.
+
+    uvicorn scripts.fake_llm_server:app --port 9000
+    GROQ_BASE_URL=http://localhost:9000 uvicorn app.main:app
+
+FAKE_LLM_LATENCY (seconds) and FAKE_LLM_FAILURE_RATE (0.0-1.0) control how slow
+and how flaky the server is, so retries and the circuit breaker can be exercised.
+"""
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+LATENCY = float(os.getenv("FAKE_LLM_LATENCY", "0.2"))
+FAILURE_RATE = float(os.getenv("FAKE_LLM_FAILURE_RATE", "0.0"))
+
+app = FastAPI(title="Fake LLM")
+
+PARSED = {
+    "nama_mahasiswa": "Mahasiswa Uji",
+    "event_name": "Lomba Uji Coba Nasional",
+    "rank_raw": "Juara 1",
+    "level_raw": "Nasional",
+    "date_issued": "01-01-2025",
+    "category_raw": "Akademik",
+    "domain_raw": "AI",
+    "confidence": 0.9,
+}
+
+@app.post("/openai/v1/chat/completions")
+async def chat_completions(body: dict):
+    await asyncio.sleep(LATENCY)
+    if random.random() < FAILURE_RATE:
+        return JSONResponse(status_code=503, content={"error": {"message": "fake upstream failure"}})
+
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "fake"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": json.dumps(PARSED)},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
@@ -0,0 +1,72 @@
+"""Fill certificates.embedding_q from the JSON float lists in certificates.embedding.
+
+    python -m scripts.migrate_embeddings [--dtype float16|int8] [--batch-size 500] [--dry-run]
+
+Requires migrations/002_certificates_embedding_q.sql and
+migrations/007_bulk_set_embedding_q.sql. Walks the table in id order, writes
+each page back in one call and only touches rows whose embedding_q is missing
+or was packed with a different dtype, so it can be stopped and re-run at any
+point.
+"""
+import argparse
+
+from app.config.database import get_db
+from app.config.settings import service_settings
+from app.services.embedding_codec import decode_embedding, encode_embedding, encoded_dtype
+
+
+def migrate(dtype: str, batch_size: int, dry_run: bool) -> None:
+    db = get_db()
+    last_id = None
+    scanned = converted = json_bytes = packed_bytes = 0
+
+    while True:
+        query = db.table("certificates").select("id, embedding, embedding_q")\
+            .not_.is_("embedding", "null")\
+            .order("id")\
+            .limit(batch_size)
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        rows = query.execute().data
+        if not rows:
+            break
+
+        payload = []
+        for row in rows:
+            scanned += 1
+            current = row.get("embedding_q")
+            if current and encoded_dtype(current) == dtype:
+                continue
+
+            vector = decode_embedding(row.get("embedding"))
+            if vector is None:
+                continue
+
+            packed = encode_embedding(vector, dtype)
+            converted += 1
+            json_bytes += len(str(row["embedding"]))
+            packed_bytes += len(packed)
+            payload.append({"id": row["id"], "embedding_q": packed})
+
+        if payload and not dry_run:
+            db.rpc("bulk_set_embedding_q", {"rows": payload}).execute()
+
+        last_id = rows[-1]["id"]
+        print(f"{scanned} scanned, {converted} {'would convert' if dry_run else 'converted'}")
+
+    if converted:
+        print(f"payload {json_bytes} bytes as JSON -> {packed_bytes} bytes as {dtype} "
+              f"({json_bytes / packed_bytes:.1f}x smaller)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dtype", choices=["float16", "int8"], default=service_settings.EMBEDDING_STORAGE_DTYPE)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    migrate(args.dtype, args.batch_size, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
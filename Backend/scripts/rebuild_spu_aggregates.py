@@ -0,0 +1,23 @@
+"""Rebuild student_spu_aggregates and student_spu_daily from the certificates table.
+
+    python -m scripts.rebuild_spu_aggregates [--page-size 1000]
+
+The API keeps each student's row current on every certificate write; run
+this after bulk changes made outside the API (rescoring, manual edits) or
+whenever the leaderboard looks out of step with the certificates.
+"""
+import argparse
+
+from app.services.spu_aggregates import rebuild_aggregates
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--page-size", type=int, default=1000)
+    args = parser.parse_args()
+    students = rebuild_aggregates(page_size=args.page_size)
+    print(f"rebuilt aggregates for {students} students")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Recompute every certificate embedding from its stored text.
+
+    python -m scripts.reembed_certificates [--workers 4] [--batch-size 256] [--restart]
+
+Requires migrations/003_certificates_cleaned_text.sql. Walks certificates in
+id order; each page is encoded on a process pool (one model copy per worker)
+and written back with a single bulk_set_embeddings call. The last written id
+is checkpointed after every page, so an interrupted run resumes where it
+stopped; a finished run removes the checkpoint. Rows stored before cleaned_text existed are embedded from their
+parsed fields.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional
+
+from app.config.database import get_db
+from app.config.settings import service_settings
+from app.controllers.certificates.certificates_controller import EMBEDDING_MODEL, certificate_embedding_text
+from app.services.embedding_codec import encode_embedding
+from app.services.embedding_service import encode_batch
+
+DEFAULT_CHECKPOINT = "/tmp/aura_reembed_checkpoint.json"
+
+
+def load_checkpoint(path: str, model: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path) as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if checkpoint.get("model") != model:
+        print(f"ignoring checkpoint for model {checkpoint.get('model')}")
+        return None
+    return checkpoint
+
+
+def save_checkpoint(path: str, checkpoint: Dict[str, Any]) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+def reembed(workers: int, batch_size: int, chunk_size: int, checkpoint_path: str, restart: bool, dry_run: bool) -> None:
+    db = get_db()
+    checkpoint = None if restart else load_checkpoint(checkpoint_path, EMBEDDING_MODEL)
+    checkpoint = checkpoint or {"model": EMBEDDING_MODEL, "last_id": None, "written": 0}
+    if checkpoint["last_id"]:
+        print(f"resuming after {checkpoint['last_id']} ({checkpoint['written']} already written)")
+
+    started = time.perf_counter()
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        while True:
+            query = db.table("certificates").select("id, cleaned_text, parsed").order("id").limit(batch_size)
+            if checkpoint["last_id"] is not None:
+                query = query.gt("id", checkpoint["last_id"])
+            rows = query.execute().data
+            if not rows:
+                break
+
+            # 1. Encode the page in chunks spread over the workers
+            pending = [(row["id"], certificate_embedding_text(row)) for row in rows]
+            pending = [(cert_id, text) for cert_id, text in pending if text]
+            texts = [text for _, text in pending]
+            chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+            vectors = [v for chunk in pool.map(encode_batch, [EMBEDDING_MODEL] * len(chunks), chunks) for v in chunk]
+
+            # 2. Write the page back in one call
+            payload = [
+                {
+                    "id": cert_id,
+                    "embedding": vector,
+                    "embedding_q": encode_embedding(vector, service_settings.EMBEDDING_STORAGE_DTYPE),
+                }
+                for (cert_id, _), vector in zip(pending, vectors)
+            ]
+            if payload and not dry_run:
+                db.rpc("bulk_set_embeddings", {"rows": payload}).execute()
+
+            # 3. Checkpoint only after the write succeeded
+            checkpoint["last_id"] = rows[-1]["id"]
+            checkpoint["written"] += len(payload)
+            if not dry_run:
+                save_checkpoint(checkpoint_path, checkpoint)
+            elapsed = time.perf_counter() - started
+            print(f"{checkpoint['written']} {'would be written' if dry_run else 'written'}, "
+                  f"last id {checkpoint['last_id']}, {elapsed:.0f}s")
+
+    if not dry_run:
+        # The saved IVF build holds the old vectors; the API rebuilds it on its next start
+        shutil.rmtree(service_settings.SEARCH_INDEX_DIR, ignore_errors=True)
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        print("done; restart the API to reload the search index")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--batch-size", type=int, default=256, help="rows fetched and written per page")
+    parser.add_argument("--chunk-size", type=int, default=32, help="texts per encode call on a worker")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    reembed(args.workers, args.batch_size, args.chunk_size, args.checkpoint, args.restart, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
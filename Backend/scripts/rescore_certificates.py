@@ -0,0 +1,61 @@
+"""Recompute after_normalized/spu_score for every completed certificate.
+
+    python -m scripts.rescore_certificates [--batch-size 500] [--dry-run]
+
+Walks the certificates table in id order and only writes rows whose score
+changed, so re-running after a rule change is cheap. The per-student
+leaderboard aggregates are rebuilt afterwards when any score changed.
+"""
+import argparse
+
+from app.config.database import get_db
+from app.controllers.certificates.scoring import score_parsed_data
+from app.services.spu_aggregates import rebuild_aggregates
+
+
+def rescore(batch_size: int, dry_run: bool) -> None:
+    db = get_db()
+    last_id = None
+    scanned = changed = 0
+
+    while True:
+        query = db.table("certificates").select("id, parsed, after_normalized").order("id").limit(batch_size)
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        rows = query.execute().data
+        if not rows:
+            break
+
+        for row in rows:
+            scanned += 1
+            current = row.get("after_normalized")
+            # Certificates that were never completed have nothing to rescore
+            if not current:
+                continue
+
+            rescored = score_parsed_data(row.get("parsed"))
+            if rescored is None or rescored == {k: current.get(k) for k in rescored}:
+                continue
+
+            changed += 1
+            print(f"{row['id']}: spu {current.get('spu_score')} -> {rescored['spu_score']}")
+            if not dry_run:
+                db.table("certificates").update({"after_normalized": rescored}).eq("id", row["id"]).execute()
+
+        last_id = rows[-1]["id"]
+
+    print(f"scanned {scanned} certificates, {changed} {'would change' if dry_run else 'updated'}")
+    if changed and not dry_run:
+        print(f"rebuilt leaderboard aggregates for {rebuild_aggregates()} students")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    rescore(args.batch_size, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
@@ -243,13 +243,21 @@ export function initInputSectionComponent() {
 
       const result = await response.json();
 
-      if (response.ok && result.status_code === 200) {
-        state.uploadResponse = result.data;
-        populateStep2(result.data.parsed);
+      if (!response.ok || result.status_code !== 202) {
+        notification.show("Upload Failed", result.message || "Unknown error", { type: "error" });
+        return;
+      }
+
+      btnUpload.textContent = "Processing...";
+      const job = await waitForUploadJob(result.data.job_id);
+
+      if (job && job.status === "done") {
+        state.uploadResponse = job.result;
+        populateStep2(job.result.parsed);
         goToStep(2);
         notification.show("Success", "Certificate uploaded and parsed successfully", { type: "success" });
       } else {
-        notification.show("Upload Failed", result.message || "Unknown error", { type: "error" });
+        notification.show("Upload Failed", (job && job.error) || "Unknown error", { type: "error" });
       }
     } catch (error) {
       console.error("Upload error:", error);
@@ -260,6 +268,21 @@ export function initInputSectionComponent() {
     }
   });
 
+  // Poll the ingestion job until the worker finishes or fails
+  async function waitForUploadJob(jobId, intervalMs = 1500, maxAttempts = 200) {
+    for (let attempt = 0; attempt < maxAttempts; attempt++) {
+      await new Promise((resolve) => setTimeout(resolve, intervalMs));
+      const response = await authAPI.apiRequest(`/users/certificates/jobs/${jobId}`);
+      if (!response.success || response.status_code !== 200) {
+        return { status: "failed", error: response.message || response.error };
+      }
+      if (response.data.status === "done" || response.data.status === "failed") {
+        return response.data;
+      }
+    }
+    return { status: "failed", error: "Processing is taking too long, please check again later." };
+  }
+
   // Step 2 Logic
   function populateStep2(data) {
     inputEventName.value = data.event_name || "";